@@ -1,11 +1,21 @@
 import dash
-from dash import dcc, html
+from dash import dcc, html, Patch
 from dash.dependencies import Input, Output, State
 import plotly.graph_objects as go
 import plotly.express as px
+import os
+import sys
 import datetime
-import random
 import json
+import time
+import zlib
+import bisect
+import argparse
+import tempfile
+import threading
+import http.client
+from collections import OrderedDict
+from urllib.parse import urlparse
 
 # --- 1. CONFIGURATION AND ASSUMPTIONS ---
 
@@ -21,60 +31,298 @@ MJPEG_URL = "http://localhost:8080/mjpeg"
 # compiling/processing Tailwind (e.g., using dash-tailwindcss-components
 # or a custom setup). We are applying the classes directly for maximum fidelity.
 
-# --- 2. SIMULATED REAL-TIME DATA GENERATION ---
-
-# Initialize global state for persistence
-current_stats = {
-    "total_frames": 10000,
-    "total_detections": 350,
-    "fps": 24.0,
-    "max_bison_in_frame": 8,
-    "avg_confidence": 0.85,
-    "class_counts": {"bison": 8, "elk": 2, "moose": 1, "car": 0},
-    "bison_count_history": [5, 6, 8, 7, 9, 8, 10, 12],
-    "timestamp_history": [
-        (datetime.datetime.now() - datetime.timedelta(minutes=i)).strftime('%H:%M:%S')
-        for i in range(8)
-    ][::-1],
-}
-
-def generate_simulated_stats():
-    """Generates new simulated data for the dashboard update."""
-    global current_stats
-    
-    # Update KPIs based on the previous state
-    current_stats["total_frames"] += random.randint(50, 150)
-    current_stats["total_detections"] += random.randint(5, 20)
-    current_stats["fps"] = round(random.uniform(23.5, 26.5), 1)
-    current_stats["max_bison_in_frame"] = random.randint(5, 15)
-    current_stats["avg_confidence"] = round(random.uniform(0.80, 0.99), 3)
-    current_stats["timestamp"] = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-
-    # Update counts and history
-    new_bison_count = random.randint(7, 13)
-    current_stats["class_counts"]["bison"] = new_bison_count
-    current_stats["class_counts"]["elk"] = random.randint(0, 3)
-    current_stats["class_counts"]["moose"] = random.randint(0, 1)
-    current_stats["class_counts"]["car"] = random.randint(0, 1)
-
-    # Rolling history update (Max 10 points for a clean chart)
-    current_stats["bison_count_history"].append(new_bison_count)
-    if len(current_stats["bison_count_history"]) > 10:
-        current_stats["bison_count_history"].pop(0)
-    
-    new_timestamp = datetime.datetime.now().strftime('%H:%M:%S')
-    current_stats["timestamp_history"].append(new_timestamp)
-    if len(current_stats["timestamp_history"]) > 10:
-        current_stats["timestamp_history"].pop(0)
-
-    # Simulated Hotspot Data (20x20 grid, random values)
-    current_stats["hotspot_data"] = [[random.uniform(0, 1) for _ in range(20)] for _ in range(20)]
-
-    return current_stats
+# --- 2. SHARED TRACKER POLLER ---
+
+POLL_INTERVAL = 1.0           # seconds between /stats requests (shared by all sessions)
+HISTORY_POLL_INTERVAL = 5.0   # seconds between /history and /heatmap requests
+TREND_WINDOW = 600            # seconds of /history shown in the trend charts
+HTTP_TIMEOUT = 3.0            # seconds per request to the tracker
+SHARED_DIR = tempfile.gettempdir()   # snapshot file + poller lock shared by worker processes
+
+
+def empty_snapshot():
+    """Dashboard data shown before the tracker has answered."""
+    return {
+        "total_frames": 0,
+        "total_detections": 0,
+        "fps": 0.0,
+        "max_bison_in_frame": 0,
+        "avg_confidence": 0.0,
+        "class_counts": {"bison": 0},
+        "bison_count_history": [],
+        "timestamp_history": [],
+        "history_t": [],
+        "hotspot_data": [[0.0]],
+        "timestamp": datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        "connected": False,
+    }
+
+
+def build_snapshot(stats, history, heatmap):
+    """Map the tracker's /stats, /history and /heatmap payloads onto the dashboard data."""
+    trend = [(t, c) for t, c in zip(history.get("t", []), history.get("count", [])) if c is not None]
+    grid_max = heatmap.get("max") or 0.0
+    grid = heatmap.get("grid") or [[0.0]]
+    return {
+        "total_frames": stats.get("total_frames", 0),
+        "total_detections": stats.get("total_detections", 0),
+        "fps": round(stats.get("fps", 0.0), 1),
+        "max_bison_in_frame": stats.get("max_bison_in_frame", 0),
+        "avg_confidence": round(stats.get("avg_confidence", 0.0), 3),
+        "class_counts": {"bison": stats.get("bison_count", 0)},
+        "bison_count_history": [round(c, 2) for _, c in trend],
+        "timestamp_history": [datetime.datetime.fromtimestamp(t).strftime('%H:%M:%S') for t, _ in trend],
+        "history_t": [t for t, _ in trend],   # epoch seconds, used to patch the trend incrementally
+        # normalized to 0..1 for the fixed heatmap colour scale
+        "hotspot_data": [[v / grid_max for v in row] for row in grid] if grid_max > 0 else grid,
+        "timestamp": datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        "connected": True,
+    }
+
+
+def _try_lock(f):
+    """Non-blocking exclusive lock on an open file; released when the process exits."""
+    try:
+        if os.name == "nt":
+            import msvcrt
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+class TrackerPoller:
+    """
+    A single background thread polls the tracker over one keep-alive HTTP
+    connection and keeps the latest dashboard snapshot.
+    Every Dash session reads that snapshot, so the tracker sees the same
+    request rate however many dashboards are open.
+
+    With several worker processes, the worker holding SHARED_DIR's lock file
+    is the only one polling; it writes each snapshot to a shared JSON file
+    (atomic replace) that the other workers reload when it changes. If the
+    polling worker dies its lock is released and another worker takes over.
+    """
+    def __init__(self, base_url=API_BASE_URL, shared_dir=SHARED_DIR):
+        parsed = urlparse(base_url)
+        self.host = parsed.hostname
+        self.port = parsed.port or 80
+        self.conn = None
+        self.lock = threading.Lock()
+        self.thread = None
+        self.data = empty_snapshot()
+        # one shared store per tracker URL
+        name = f"bison_dash_{self.host}_{self.port}"
+        self.snapshot_path = os.path.join(shared_dir, name + ".json")
+        self.lock_path = os.path.join(shared_dir, name + ".lock")
+        self.lock_file = None
+        self.snapshot_mtime = None
+
+    def start(self):
+        with self.lock:
+            if self.thread is None:
+                self._read_shared()   # serve the polling worker's data from the first request
+                self.thread = threading.Thread(target=self._run, daemon=True)
+                self.thread.start()
+
+    def snapshot(self):
+        """Latest dashboard data (replaced wholesale on every poll; treat as read-only)."""
+        with self.lock:
+            return self.data
+
+    def _run(self):
+        lock_file = open(self.lock_path, "a+")
+        while not _try_lock(lock_file):
+            self._load_shared()
+            time.sleep(POLL_INTERVAL)
+        self.lock_file = lock_file   # held for the life of the process
+        self._poll_loop()
+
+    def _load_shared(self):
+        """Follower: pick up the polling worker's latest snapshot if the file changed."""
+        with self.lock:
+            self._read_shared()
+
+    def _read_shared(self):
+        # caller holds self.lock
+        try:
+            mtime = os.stat(self.snapshot_path).st_mtime_ns
+            if mtime == self.snapshot_mtime:
+                return
+            with open(self.snapshot_path, encoding="utf-8") as f:
+                self.data = json.load(f)
+            self.snapshot_mtime = mtime
+        except (OSError, ValueError):
+            pass
+
+    def _publish(self, data):
+        with self.lock:
+            self.data = data
+        tmp = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.snapshot_path)
+        except OSError:
+            pass   # e.g. a reader holds the file on Windows; the next poll rewrites it
+
+    def _get_json(self, path):
+        # A kept-alive socket may have been closed by the server; reconnect once
+        for attempt in range(2):
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=HTTP_TIMEOUT)
+            try:
+                self.conn.request("GET", path)
+                resp = self.conn.getresponse()
+                body = resp.read()
+                break
+            except (OSError, http.client.HTTPException):
+                self.conn.close()
+                self.conn = None
+                if attempt:
+                    raise
+        if resp.status != 200:
+            raise ValueError(f"{path}: HTTP {resp.status}")
+        return json.loads(body)
+
+    def _poll_loop(self):
+        history, heatmap = {}, {}
+        last_history = 0.0
+        while True:
+            started = time.time()
+            try:
+                stats = self._get_json("/stats")
+                if started - last_history >= HISTORY_POLL_INTERVAL:
+                    history = self._get_json(f"/history?from={started - TREND_WINDOW:.0f}&res=1s")
+                    heatmap = self._get_json("/heatmap")
+                    last_history = started
+                data = build_snapshot(stats, history, heatmap)
+            except (OSError, ValueError, http.client.HTTPException) as e:
+                # keep showing the last good snapshot, flagged as offline
+                with self.lock:
+                    data = dict(self.data, connected=False, error=str(e))
+            self._publish(data)
+            time.sleep(max(0.0, POLL_INTERVAL - (time.time() - started)))
+
+
+poller = TrackerPoller()
+
+
+# --- 2b. TREND AGGREGATION CACHE ---
+
+TREND_SPAN = 14 * 86400       # seconds of history on the /trends page
+TREND_POINTS = 1000           # points per trend, downsampled by the tracker (LTTB)
+TREND_RES = "1m"              # /history resolution used for /trends
+TREND_RES_SECONDS = {"1s": 1, "1m": 60, "1h": 3600}
+TREND_CACHE_TTL = 30.0        # seconds a computed trend is reused
+TREND_CACHE_SIZE = 32         # trends kept before the least recently used is evicted
+
+
+class _Flight:
+    """One in-progress computation that other callers of the same key wait on."""
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class TrendCache:
+    """
+    Memoizes trend aggregations by (resolution, time bucket). Entries expire
+    after `ttl` seconds and the least recently used entry is evicted beyond
+    `max_entries`. Concurrent callers asking for the same missing key share a
+    single computation (single-flight) instead of each hitting the tracker.
+    """
+    def __init__(self, ttl=TREND_CACHE_TTL, max_entries=TREND_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()   # key -> (computed_at, value), oldest use first
+        self.inflight = {}
+        self.lock = threading.Lock()
+
+    def get(self, key, compute):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and time.time() - entry[0] < self.ttl:
+                self.entries.move_to_end(key)
+                return entry[1]
+            flight = self.inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.inflight[key] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = compute()
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.inflight[key]
+                if flight.error is None:
+                    self.entries[key] = (time.time(), flight.value)
+                    self.entries.move_to_end(key)
+                    while len(self.entries) > self.max_entries:
+                        self.entries.popitem(last=False)
+            flight.done.set()
+        return flight.value
+
+
+trend_cache = TrendCache()
+
+
+def fetch_json(path):
+    """One-off GET against the tracker (the poller's connection belongs to its thread)."""
+    parsed = urlparse(API_BASE_URL)
+    conn = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=HTTP_TIMEOUT)
+    try:
+        conn.request("GET", path)
+        resp = conn.getresponse()
+        body = resp.read()
+    finally:
+        conn.close()
+    if resp.status != 200:
+        raise ValueError(f"{path}: HTTP {resp.status}")
+    return json.loads(body)
+
+
+def aggregate_trend(t_from, t_to, res, points=TREND_POINTS):
+    """
+    Mean bison count per `res` bucket over [t_from, t_to], downsampled to `points`, as x / y
+    lists. "version" is a checksum of the rows, identical in every worker process for the
+    same data, so callbacks can tell whether a browser already has this trend.
+    """
+    history = fetch_json(f"/history?from={t_from:.0f}&to={t_to:.0f}&res={res}&points={points}")
+    rows = [(t, c) for t, c in zip(history.get("t", []), history.get("count", [])) if c is not None]
+    return {
+        "x": [datetime.datetime.fromtimestamp(t).strftime('%Y-%m-%d %H:%M:%S') for t, _ in rows],
+        "y": [round(c, 2) for _, c in rows],
+        "version": zlib.crc32(json.dumps(rows).encode()),
+    }
+
+
+def trend_series(span=TREND_SPAN, res=TREND_RES):
+    """Cached trend for the last `span` seconds; viewers in the same bucket share it."""
+    bucket = int(time.time() // TREND_RES_SECONDS[res])
+    t_to = (bucket + 1) * TREND_RES_SECONDS[res]
+    try:
+        return trend_cache.get((res, span, bucket),
+                               lambda: aggregate_trend(t_to - span, t_to, res))
+    except (OSError, ValueError, http.client.HTTPException):
+        return {"x": [], "y": [], "version": None}
 
 # --- 3. HELPER COMPONENTS ---
 
-def create_kpi_card(title, value, unit="", icon_class=""):
+def create_kpi_card(title, value, unit="", icon_class="", kpi_id=None):
     """Creates a standardized KPI card component."""
     return html.Div(
         className="card p-4 shadow-xl flex flex-col justify-center items-center h-full",
@@ -82,7 +330,7 @@ def create_kpi_card(title, value, unit="", icon_class=""):
             html.Div(className=f"text-4xl text-purple-400 {icon_class}"),
             html.Div(
                 className="text-4xl font-extrabold mt-2 text-white",
-                id=f"kpi-{title.lower().replace(' ', '_')}",
+                id=kpi_id or f"kpi-{title.lower().replace(' ', '_')}",
                 children=[f"{value:.1f}" if isinstance(value, float) else f"{value}"],
             ),
             html.Div(className="text-sm uppercase tracking-wider text-gray-400 mt-1", children=title),
@@ -115,8 +363,9 @@ def get_page_layout_overview(data):
 
     # 2. Bison Count Trend Line Chart
     fig_trend = px.line(
-        x=data["timestamp_history"], y=data["bison_count_history"],
-        title='Bison Count Trend (Last 10 Updates)',
+        # [None] keeps px.line happy until the tracker has history
+        x=data["timestamp_history"] or [None], y=data["bison_count_history"] or [None],
+        title='Bison Count Trend (Last 10 Minutes)',
         labels={'x': 'Time', 'y': 'Bison Count'},
         template="plotly_dark",
     )
@@ -135,7 +384,7 @@ def get_page_layout_overview(data):
         zmin=0, zmax=1
     ))
     fig_hotspot.update_layout(
-        title='Bison Activity Hotspot (Simulated)',
+        title='Bison Activity Hotspot',
         plot_bgcolor="#2a2438", paper_bgcolor="#2a2438", font_color="#e6edf3",
         margin=dict(l=20, r=20, t=40, b=20),
         xaxis={'showgrid': False, 'zeroline': False, 'tickvals': [], 'title': 'Grid X'},
@@ -147,7 +396,8 @@ def get_page_layout_overview(data):
         # --- Live Stats Section (KPI Cards) ---
         html.Div(className="grid grid-cols-1 md:grid-cols-4 gap-4 mb-6", children=[
             create_kpi_card("Current FPS", data["fps"], icon_class="fa-gauge-high"),
-            create_kpi_card("Max Bison (Frame)", data["max_bison_in_frame"], icon_class="fa-cow"),
+            create_kpi_card("Max Bison (Frame)", data["max_bison_in_frame"], icon_class="fa-cow",
+                            kpi_id="kpi-max_bison_in_frame"),
             create_kpi_card("Total Detections", data["total_detections"], icon_class="fa-bullseye"),
             create_kpi_card("Avg Confidence", data["avg_confidence"], icon_class="fa-check-double"),
         ]),
@@ -168,6 +418,12 @@ def get_page_layout_overview(data):
                 dcc.Graph(id='hotspot-map', figure=fig_hotspot, config={'displayModeBar': False})
             ]),
         ]),
+
+        # Last point of the trend chart as built, so ticks can append to it
+        dcc.Store(id='overview-trend', data=trend_state(data)),
+
+        # Browser-measured Plotly redraw time per chart (ms), written by callback 6b
+        dcc.Store(id='render-timing', data={}),
     ])
 
 def get_page_layout_streams(data):
@@ -207,24 +463,28 @@ def get_page_layout_streams(data):
         # Live Stats (Duplicated from Overview for quick reference)
         html.H3("Current Stream Metrics", className="text-2xl font-bold mb-4 mt-6 text-white"),
         html.Div(className="grid grid-cols-1 md:grid-cols-4 gap-4", children=[
-            create_kpi_card("Current FPS", data["fps"], icon_class="fa-video"),
+            create_kpi_card("Current FPS", data["fps"], icon_class="fa-video", kpi_id="kpi-stream_fps"),
             create_kpi_card("Last Update", data["timestamp"], icon_class="fa-clock"),
             create_kpi_card("Total Frames", data["total_frames"], icon_class="fa-infinity"),
-            create_kpi_card("Total Detections", data["total_detections"], icon_class="fa-binoculars"),
+            create_kpi_card("Total Detections", data["total_detections"], icon_class="fa-binoculars",
+                            kpi_id="kpi-stream_total_detections"),
         ]),
     ])
 
 def get_page_layout_trends(data):
     """Layout for the /trends page (Historical Data and Reporting)."""
     
-    # Simple aggregation of detection history over time (using current_stats history)
+    # Bison density over the last TREND_SPAN seconds (cached /history aggregation)
+    trend = trend_series()
     fig_detections = px.line(
-        x=data["timestamp_history"], y=data["bison_count_history"],
-        title='Historical Bison Density Trend',
+        # [None] keeps px.line happy until the tracker has history
+        x=trend["x"] or [None], y=trend["y"] or [None],
+        title=f'Historical Bison Density Trend (Last {TREND_SPAN // 86400} Days)',
         labels={'x': 'Time', 'y': 'Bison Count (Per Frame)'},
         template="plotly_dark",
     )
-    fig_detections.update_traces(mode='lines+markers', line=dict(color="#10b981", width=3), marker=dict(size=8, color='white', line=dict(width=2, color="#10b981")))
+    # Up to TREND_POINTS points: a plain line reads better than markers at this density
+    fig_detections.update_traces(mode='lines', line=dict(color="#10b981", width=2))
     fig_detections.update_layout(
         plot_bgcolor="#2a2438", paper_bgcolor="#2a2438", font_color="#e6edf3",
         margin=dict(l=20, r=20, t=40, b=20),
@@ -333,44 +593,80 @@ app.layout = html.Div(
             interval=5*1000,  # in milliseconds
             n_intervals=0
         ),
-        
-        # 4. Hidden Div to store and trigger data updates across pages
-        html.Div(id='data-storage', style={'display': 'none'}, children=json.dumps(generate_simulated_stats())),
-    ]
-)
 
-# --- 6. CALLBACKS ---
+        # 4. Per-session KPI values (numbers; formatted by clientside callbacks)
+        dcc.Store(id='kpi-store'),
 
-# Callback 1: Real-Time Data Update
-@app.callback(
-    Output('data-storage', 'children'),
-    Input('interval-component', 'n_intervals')
+        # 5. Version of the trend this session's density chart was last patched with
+        dcc.Store(id='trend-version'),
+    ]
 )
-def update_data(n):
-    """Fetches/simulates new data on a fixed interval and stores it."""
-    new_data = generate_simulated_stats()
-    return json.dumps(new_data)
 
-# Callback 2: Routing/Page Switching
+# --- 6. CALLBACKS ---
+# Pages are built once per navigation. After that, each interval tick sends
+# the KPI fields that changed into the 'kpi-store' (formatted in the browser
+# by clientside callbacks) and data-only figure Patches for the page that is
+# open, all read straight from the shared poller snapshot.
+
+KPI_FIELDS = ("fps", "max_bison_in_frame", "total_detections", "avg_confidence",
+              "total_frames", "timestamp", "connected")
+
+
+def current_data():
+    poller.start()
+    return poller.snapshot()
+
+
+def trend_state(data):
+    """Last timestamp and point count of a trend chart showing `data`'s history."""
+    ts = data["history_t"]
+    return {"end": ts[-1], "n": len(ts)} if ts else None
+
+
+def trend_patch(data, shown):
+    """
+    Patch the overview trend from `shown` (its trend_state) to `data`: drop the
+    points that left the window, rewrite the last shown point (its second may
+    have been partial) and append the new ones. Both arrays are replaced when
+    the chart and the history no longer line up.
+    """
+    ts = data["history_t"]
+    xs, ys = data["timestamp_history"], data["bison_count_history"]
+    line = Patch()
+    trace = line['data'][0]
+    i = bisect.bisect_left(ts, shown["end"]) if shown else len(ts)
+    drop = shown["n"] - 1 - i if shown else -1
+    if i == len(ts) or ts[i] != shown["end"] or drop < 0:
+        trace['x'] = xs
+        trace['y'] = ys
+        return line
+    for _ in range(drop):
+        del trace['x'][0]
+        del trace['y'][0]
+    trace['x'][i] = xs[i]
+    trace['y'][i] = ys[i]
+    if i + 1 < len(ts):
+        trace['x'].extend(xs[i + 1:])
+        trace['y'].extend(ys[i + 1:])
+    return line
+
+
+# Callback 1: Routing/Page Switching
 @app.callback(
     Output('page-layout', 'children'),
-    [Input('url', 'pathname'),
-     Input('data-storage', 'children')]
+    Input('url', 'pathname')
 )
-def render_page(pathname, data_json):
-    """Renders the correct page layout based on the URL and uses the latest data."""
-    if not data_json:
-        return html.Div("Loading data...", className="text-white p-10")
-        
-    data = json.loads(data_json)
-    
+def render_page(pathname):
+    """Renders the correct page layout based on the URL, seeded with the latest data."""
+    data = current_data()
+
     if pathname == '/streams':
         return get_page_layout_streams(data)
     elif pathname == '/trends':
         return get_page_layout_trends(data)
     elif pathname == '/':
         return get_page_layout_overview(data)
-        
+
     # Default/404 Page
     return html.Div(
         className="p-10 text-white",
@@ -380,66 +676,200 @@ def render_page(pathname, data_json):
         ]
     )
 
-# Callback 3: Update KPI Cards and Last Update Time (Universal Data Display)
+# Callback 2: KPI store (only the fields that changed since this session's last tick)
 @app.callback(
+    Output('kpi-store', 'data'),
+    Input('interval-component', 'n_intervals'),
+    State('kpi-store', 'data')
+)
+def update_kpi_store(n, current):
+    data = current_data()
+    fresh = {key: data[key] for key in KPI_FIELDS}
+    if not current:
+        return fresh
+    changed = {key: value for key, value in fresh.items() if current.get(key) != value}
+    if not changed:
+        return dash.no_update
+    patch = Patch()
+    for key, value in changed.items():
+        patch[key] = value
+    return patch
+
+# Callback 3: Last Update Time (sidebar, shown on every page)
+app.clientside_callback(
+    """
+    function(kpi) {
+        if (!kpi) { return window.dash_clientside.no_update; }
+        var text = "Data last fetched: " + kpi.timestamp.split(" ")[1];
+        return kpi.connected ? text : text + " (tracker offline)";
+    }
+    """,
+    Output('last-update-time', 'children'),
+    Input('kpi-store', 'data')
+)
+
+# Callback 4: Overview KPI cards
+app.clientside_callback(
+    """
+    function(kpi) {
+        if (!kpi) { return window.dash_clientside.no_update; }
+        return [kpi.fps.toFixed(1), String(kpi.max_bison_in_frame),
+                String(kpi.total_detections), kpi.avg_confidence.toFixed(3)];
+    }
+    """,
     [Output('kpi-current_fps', 'children'),
      Output('kpi-max_bison_in_frame', 'children'),
      Output('kpi-total_detections', 'children'),
-     Output('kpi-avg_confidence', 'children'),
-     Output('last-update-time', 'children')],
-    [Input('data-storage', 'children')]
+     Output('kpi-avg_confidence', 'children')],
+    Input('kpi-store', 'data')
 )
-def update_kpi_and_time(data_json):
-    """Updates the KPIs and the last update time, which are shared across all pages."""
-    if not data_json:
-        return [dash.no_update] * 5
-
-    data = json.loads(data_json)
 
-    # Format the KPI values
-    fps = f"{data['fps']:.1f}"
-    max_bison = f"{data['max_bison_in_frame']}"
-    total_detections = f"{data['total_detections']}"
-    avg_confidence = f"{data['avg_confidence']:.3f}"
-    last_update = f"Data last fetched: {data['timestamp'].split(' ')[1]}"
-
-    return fps, max_bison, total_detections, avg_confidence, last_update
+# Callback 5: Streams page metrics
+app.clientside_callback(
+    """
+    function(kpi) {
+        if (!kpi) { return window.dash_clientside.no_update; }
+        return [kpi.fps.toFixed(1), kpi.timestamp,
+                String(kpi.total_frames), String(kpi.total_detections)];
+    }
+    """,
+    [Output('kpi-stream_fps', 'children'),
+     Output('kpi-last_update', 'children'),
+     Output('kpi-total_frames', 'children'),
+     Output('kpi-stream_total_detections', 'children')],
+    Input('kpi-store', 'data')
+)
 
+# Callback 6: Overview chart data
+@app.callback(
+    [Output('class-detections-chart', 'figure'),
+     Output('bison-count-trend', 'figure'),
+     Output('hotspot-map', 'figure'),
+     Output('overview-trend', 'data')],
+    Input('interval-component', 'n_intervals'),
+    State('overview-trend', 'data'),
+    prevent_initial_call=True
+)
+def update_overview(n, shown):
+    data = current_data()
+
+    # px.bar with color=classes draws one trace per class
+    classes = Patch()
+    for i, count in enumerate(data["class_counts"].values()):
+        classes['data'][i]['y'] = [count]
+
+    trend = trend_patch(data, shown)
+
+    hotspot = Patch()
+    hotspot['data'][0]['z'] = data["hotspot_data"]
+
+    return classes, trend, hotspot, trend_state(data)
+
+# Callback 6b: Client render time of the overview charts. Starts a timer when a
+# patched figure reaches the browser and stops it on that chart's next
+# plotly_afterplot; the last times go to 'render-timing', and every sample
+# to window.bisonRenderTimings (see README).
+app.clientside_callback(
+    """
+    function() {
+        var ctx = window.dash_clientside.callback_context;
+        var timings = window.bisonRenderTimings = window.bisonRenderTimings || [];
+        ctx.triggered.forEach(function(t) {
+            var id = t.prop_id.split('.')[0];
+            var el = document.getElementById(id);
+            var gd = el && (el.classList.contains('js-plotly-plot') ? el : el.querySelector('.js-plotly-plot'));
+            if (!gd || !gd.once) { return; }
+            var start = performance.now();
+            gd.once('plotly_afterplot', function() {
+                var ms = performance.now() - start;
+                timings.push({chart: id, ms: ms, at: Date.now()});
+                if (timings.length > 500) { timings.shift(); }
+                var latest = window.bisonRenderLatest = window.bisonRenderLatest || {};
+                latest[id] = Math.round(ms * 10) / 10;
+                if (window.dash_clientside.set_props) {
+                    window.dash_clientside.set_props('render-timing', {data: Object.assign({}, latest)});
+                }
+                console.debug('render ' + id + ': ' + ms.toFixed(1) + ' ms');
+            });
+        });
+        return window.dash_clientside.no_update;
+    }
+    """,
+    Output('render-timing', 'data'),
+    [Input('class-detections-chart', 'figure'),
+     Input('bison-count-trend', 'figure'),
+     Input('hotspot-map', 'figure')],
+    prevent_initial_call=True
+)
 
-# Callback 4: Live Updates for the Overview Charts (re-renders the page layout for efficiency)
+# Callback 7: Trends page chart data (the density series only when the cached trend changed)
 @app.callback(
-    Output('page-layout', 'children', allow_duplicate=True),
-    [Input('data-storage', 'children'),
-     State('url', 'pathname')],
-     prevent_initial_call=True
+    [Output('historical-density-chart', 'figure'),
+     Output('class-distribution-pie', 'figure'),
+     Output('trend-version', 'data')],
+    Input('interval-component', 'n_intervals'),
+    State('trend-version', 'data'),
+    prevent_initial_call=True
 )
-def update_current_page_charts(data_json, pathname):
-    """Triggers re-render of the current page's charts when data updates."""
-    if not data_json:
-        return dash.no_update
-    
-    data = json.loads(data_json)
-    
-    # Only update the layout if we are on one of the main dashboard pages
-    if pathname == '/':
-        return get_page_layout_overview(data)
-    elif pathname == '/streams':
-        return get_page_layout_streams(data)
-    elif pathname == '/trends':
-        return get_page_layout_trends(data)
-        
-    return dash.no_update
+def update_trends(n, shown_version):
+    data = current_data()
+
+    trend = trend_series()
+    if trend["version"] is not None and trend["version"] == shown_version:
+        density = dash.no_update
+    else:
+        density = Patch()
+        density['data'][0]['x'] = trend["x"]
+        density['data'][0]['y'] = trend["y"]
+
+    pie = Patch()
+    pie['data'][0]['labels'] = list(data["class_counts"].keys())
+    pie['data'][0]['values'] = list(data["class_counts"].values())
+    return density, pie, trend["version"]
+
+
+# WSGI entry point for multi-worker serving, e.g. gunicorn -w 4 app:server
+server = app.server
+
+
+def run_workers(workers, host, port):
+    """Serve with `workers` gunicorn processes; they share one poller via SHARED_DIR."""
+    from gunicorn.app.base import BaseApplication
+
+    class DashApplication(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", f"{host}:{port}")
+            self.cfg.set("workers", workers)
+            self.cfg.set("threads", 4)
+
+        def load(self):
+            return server
+
+    DashApplication().run()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Bison Guard Dash dashboard")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8050)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="worker processes (needs gunicorn); defaults to one threaded process")
+    parser.add_argument("--debug", action="store_true", help="Dash debug mode with hot reload")
+    return parser.parse_args()
 
 
 if __name__ == '__main__':
+    args = parse_args()
     # Setting the host to '0.0.0.0' allows access from outside the container/environment
     # Running on port 8050, the default DASH port.
     print("\n" + "="*80)
-    print("      DASHBOARD READY: Navigate to http://localhost:8050 in your browser.")
+    print(f"      DASHBOARD READY: Navigate to http://localhost:{args.port} in your browser.")
     print("      Ensure your backend tracker (rtsp_bison_tracker_2.py) is running on port 8080.")
     print("="*80 + "\n")
-    app.run(debug=True, host='0.0.0.0', port=8050)
-
-
-
-
+    if args.workers > 1 and not args.debug:
+        try:
+            run_workers(args.workers, args.host, args.port)
+            sys.exit(0)
+        except ImportError:
+            print("gunicorn is not installed; serving from a single process instead.")
+    app.run(debug=args.debug, host=args.host, port=args.port, threaded=True)
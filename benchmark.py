@@ -0,0 +1,460 @@
+#!/usr/bin/env python3
+"""
+Offline throughput / latency benchmark for the bison pipeline.
+
+Builds a synthetic drone-style video (or uses --source), swaps best.pt for a
+deterministic stub detector and measures:
+  - StreamManager: capture, inference, overlay, analytics, MJPEG and HLS
+    throughput plus p50/p99 frame latency (capture -> frame published)
+  - track.py:      capture, inference, overlay and encoder throughput plus
+    p50/p99 frame latency (capture -> frame queued for encoding)
+
+    python benchmark.py                       # 600 synthetic 1280x720 frames
+    python benchmark.py --stub-ms 20          # emulate a 20 ms model
+    python benchmark.py --source DJI_bison.MP4 --realtime --json bench.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+import http.client
+from http.server import ThreadingHTTPServer
+import cv2
+import numpy as np
+
+# ─── PARAMETERS ────────────────────────────────────────────────────────────────
+BENCH_FRAMES   = 600               # synthetic video length
+BENCH_SIZE     = (1280, 720)       # synthetic video resolution
+BENCH_FPS      = 25.0              # synthetic video frame rate
+BENCH_BISON    = 12                # animals drawn into the synthetic video
+STUB_LATENCY_MS = 0.0              # extra per-frame "inference" time of the stub model
+MJPEG_ENCODE_SAMPLES = 200         # frames JPEG-encoded for the MJPEG encode benchmark
+BISON_BGR      = (40, 60, 90)      # body colour drawn and detected by the stub
+# ──────────────────────────────────────────────────────────────────────────────
+
+
+def make_synthetic_video(path, frames=BENCH_FRAMES, size=BENCH_SIZE, fps=BENCH_FPS,
+                         n_bison=BENCH_BISON, seed=0):
+    """Write a grass-textured video with n_bison dark ellipses drifting across it."""
+    width, height = size
+    rng = np.random.default_rng(seed)
+    grass = np.empty((height, width, 3), dtype=np.uint8)
+    grass[:] = (60, 140, 80)
+    grass = cv2.add(grass, rng.integers(0, 40, (height, width, 3), dtype=np.uint8))
+
+    pos = rng.uniform((50, 50), (width - 50, height - 50), (n_bison, 2))
+    vel = rng.uniform(-2.0, 2.0, (n_bison, 2))
+    axes = rng.integers(18, 32, (n_bison, 2))
+
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, (width, height))
+    for _ in range(frames):
+        frame = grass.copy()
+        for (x, y), (a, b) in zip(pos, axes):
+            cv2.ellipse(frame, (int(x), int(y)), (int(a), int(b)), 0, 0, 360, BISON_BGR, -1)
+        writer.write(frame)
+        pos += vel
+        bounce = (pos < 40) | (pos > (width - 40, height - 40))
+        vel[bounce] *= -1
+    writer.release()
+
+
+# ─── STUB DETECTOR ────────────────────────────────────────────────────────────
+class _StubBoxes:
+    """The slice of ultralytics' Boxes API the trackers read."""
+    def __init__(self, xyxy, conf, ids=None):
+        self.xyxy = np.asarray(xyxy, dtype=np.float32).reshape(-1, 4)
+        self.conf = np.asarray(conf, dtype=np.float32)
+        self.cls = np.zeros(len(self.conf), dtype=np.float32)
+        self.id = None if ids is None else np.asarray(ids, dtype=np.float32)
+
+    def __len__(self):
+        return len(self.conf)
+
+
+class _StubResult:
+    def __init__(self, boxes):
+        self.boxes = boxes
+
+
+def _iou(a, b):
+    ix = max(0.0, min(a[2], b[2]) - max(a[0], b[0]))
+    iy = max(0.0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+class StubModel:
+    """
+    Deterministic stand-in for YOLO(best.pt): finds BISON_BGR blobs with a
+    colour threshold and links them across frames by greedy IoU. Inference
+    time is recorded in `timer` under "inference"; latency_ms adds a fixed
+    sleep to emulate a real model.
+    """
+    def __init__(self, timer=None, latency_ms=STUB_LATENCY_MS):
+        self.timer = timer
+        self.latency = latency_ms / 1000.0
+        self.tracks = {}
+        self.next_id = 1
+
+    def _detect(self, frame):
+        lo = np.array(BISON_BGR, dtype=np.int16) - 25
+        hi = np.array(BISON_BGR, dtype=np.int16) + 25
+        mask = cv2.inRange(frame, lo.clip(0, 255).astype(np.uint8), hi.clip(0, 255).astype(np.uint8))
+        n, _, stats, _ = cv2.connectedComponentsWithStats(mask)
+        boxes, confs = [], []
+        for x, y, w, h, area in stats[1:]:
+            if area < 100:
+                continue
+            boxes.append((x, y, x + w, y + h))
+            confs.append(min(0.99, 0.5 + area / (4.0 * w * h)))   # fill ratio -> "confidence"
+        return boxes, confs
+
+    def _timed(self, fn, frame):
+        start = time.perf_counter()
+        out = fn(frame)
+        if self.latency:
+            time.sleep(self.latency)
+        if self.timer:
+            self.timer.add("inference", time.perf_counter() - start)
+        return out
+
+    def predict(self, source, **kwargs):
+        boxes, confs = self._timed(self._detect, source)
+        return [_StubResult(_StubBoxes(boxes, confs))]
+
+    def track(self, source, persist=True, **kwargs):
+        if not persist:
+            self.tracks, self.next_id = {}, 1
+        boxes, confs = self._timed(self._detect, source)
+        ids, matched = [], {}
+        for box in boxes:
+            best = max(self.tracks.items(), key=lambda kv: _iou(kv[1], box), default=None)
+            if best and best[0] not in matched and _iou(best[1], box) > 0.3:
+                tid = best[0]
+            else:
+                tid, self.next_id = self.next_id, self.next_id + 1
+            matched[tid] = box
+            ids.append(tid)
+        self.tracks = matched
+        return [_StubResult(_StubBoxes(boxes, confs, ids))]
+
+
+# ─── TIMING HELPERS ───────────────────────────────────────────────────────────
+class StageTimer:
+    """Per-stage duration samples (seconds), safe to feed from several threads."""
+    def __init__(self):
+        self.samples = {}
+        self.lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        with self.lock:
+            self.samples.setdefault(stage, []).append(seconds)
+
+    def wrap(self, stage, fn):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.add(stage, time.perf_counter() - start)
+        return timed
+
+    def summary(self):
+        """{stage: {n, mean_ms, p50_ms, p99_ms, fps}} where fps = 1 / mean."""
+        out = {}
+        with self.lock:
+            items = list(self.samples.items())
+        for stage, values in items:
+            ms = np.asarray(values) * 1000.0
+            out[stage] = {
+                'n': len(ms),
+                'mean_ms': round(float(ms.mean()), 3),
+                'p50_ms': round(float(np.percentile(ms, 50)), 3),
+                'p99_ms': round(float(np.percentile(ms, 99)), 3),
+                'fps': round(1000.0 / float(ms.mean()), 1) if ms.mean() > 0 else None,
+            }
+        return out
+
+
+class TimedCapture:
+    """
+    cv2.VideoCapture proxy that times read(), remembers when the current frame
+    was captured, optionally paces reads to the source fps (like a live RTSP
+    feed) and signals `eof` instead of looping.
+    """
+    def __init__(self, cap, timer, fps=None, max_frames=None):
+        self.cap = cap
+        self.timer = timer
+        self.interval = 1.0 / fps if fps else 0.0
+        self.max_frames = max_frames
+        self.frames = 0
+        self.next_due = time.perf_counter()
+        self.captured_at = None
+        self.eof = threading.Event()
+
+    def read(self):
+        if self.interval:
+            delay = self.next_due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            self.next_due = max(self.next_due + self.interval, time.perf_counter() - self.interval)
+        start = time.perf_counter()
+        ret, frame = self.cap.read()
+        self.timer.add("capture", time.perf_counter() - start)
+        if not ret or (self.max_frames and self.frames >= self.max_frames):
+            self.eof.set()
+            return False, None
+        self.frames += 1
+        self.captured_at = start
+        return ret, frame
+
+    def __getattr__(self, name):
+        return getattr(self.cap, name)
+
+
+def _mjpeg_client(port, stop, result):
+    """Read /mjpeg like a browser would, counting delivered frames and bytes."""
+    conn = http.client.HTTPConnection("localhost", port, timeout=5)
+    conn.request("GET", "/mjpeg")
+    resp = conn.getresponse()
+    frames = total = 0
+    start = time.perf_counter()
+    try:
+        while not stop.is_set():
+            line = resp.fp.readline()
+            if not line:
+                break
+            if line.lower().startswith(b"content-length:"):
+                length = int(line.split(b":")[1])
+                resp.fp.readline()                  # blank line after part headers
+                total += len(resp.fp.read(length))
+                frames += 1
+    except (OSError, ValueError):
+        pass
+    elapsed = time.perf_counter() - start
+    result.update(frames=frames, fps=round(frames / elapsed, 1) if elapsed else 0.0,
+                  mb_per_s=round(total / elapsed / 1e6, 2) if elapsed else 0.0)
+    conn.close()
+
+
+def mjpeg_encode_benchmark(video, quality, samples=MJPEG_ENCODE_SAMPLES):
+    """JPEG encode throughput of the MJPEG endpoint on frames from the video."""
+    cap = cv2.VideoCapture(video)
+    frames = []
+    while len(frames) < 16:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    timer = StageTimer()
+    for i in range(samples):
+        start = time.perf_counter()
+        ok, buf = cv2.imencode('.jpg', frames[i % len(frames)], [cv2.IMWRITE_JPEG_QUALITY, quality])
+        timer.add("mjpeg_encode", time.perf_counter() - start)
+    result = timer.summary()["mjpeg_encode"]
+    result['kb_per_frame'] = round(len(buf) / 1024, 1)
+    return result
+
+
+# ─── STREAM MANAGER BENCHMARK ─────────────────────────────────────────────────
+def bench_stream_manager(video, frames, stub_ms, realtime, workdir):
+    import rtsp_bison_tracker_2 as tracker
+
+    timer = StageTimer()
+
+    class BenchStreamManager(tracker.StreamManager):
+        def _stream_loop(self):
+            fps = self.cap.get(cv2.CAP_PROP_FPS) if realtime else None
+            self.cap = TimedCapture(self.cap, timer, fps, frames)
+            self.timed_cap = self.cap
+            ready.set()
+            super()._stream_loop()
+
+        def _process_frame_with_model(self, frame, frame_count):
+            return timer.wrap("detect+overlay", super()._process_frame_with_model)(frame, frame_count)
+
+        def _update_analytics(self, now, frame_count, frame):
+            return timer.wrap("analytics", super()._update_analytics)(now, frame_count, frame)
+
+    ready = threading.Event()
+    manager = BenchStreamManager(video, apply_model=False)
+    manager.model = StubModel(timer, stub_ms)
+    manager.apply_model = True
+
+    # history.record() is the last call of a loop iteration: frame published
+    record = manager.history.record
+    def record_and_time(*args):
+        record(*args)
+        timer.add("frame_latency", time.perf_counter() - manager.timed_cap.captured_at)
+    manager.history.record = record_and_time
+
+    width, height, fps, hls_ok = manager.start_stream()
+    server = ThreadingHTTPServer(('localhost', 0), tracker.create_handler(manager))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    ready.wait()
+    stop, mjpeg = threading.Event(), {}
+    client = threading.Thread(target=_mjpeg_client, args=(server.server_address[1], stop, mjpeg),
+                              daemon=True)
+    client.start()
+
+    start = time.perf_counter()
+    manager.timed_cap.eof.wait()
+    elapsed = time.perf_counter() - start
+    hls = manager.hls
+    hls_result = {'enabled': bool(hls_ok)}
+    if hls_ok:
+        hls_result.update(frames_written=hls.frames_written,
+                          frames_duplicated=hls.frames_duplicated,
+                          frames_dropped=hls.frames_dropped,
+                          fps=round(hls.frames_written / elapsed, 1))
+    stop.set()
+    manager.stop()
+    client.join(timeout=5)
+    server.shutdown()
+    server.server_close()
+
+    processed = manager.stats['total_frames']
+    stages = timer.summary()
+    if "detect+overlay" in stages and "inference" in stages:
+        overlay_ms = stages["detect+overlay"]["mean_ms"] - stages["inference"]["mean_ms"]
+        stages["overlay"] = {'mean_ms': round(overlay_ms, 3),
+                             'fps': round(1000.0 / overlay_ms, 1) if overlay_ms > 0 else None}
+    return {
+        'frames': processed,
+        'seconds': round(elapsed, 2),
+        'fps': round(processed / elapsed, 1) if elapsed else 0.0,
+        'resolution': f"{width}x{height}",
+        'stages': stages,
+        'mjpeg_client': mjpeg,
+        'mjpeg_encode': mjpeg_encode_benchmark(video, tracker.MJPEG_QUALITY),
+        'hls': hls_result,
+    }
+
+
+# ─── TRACK.PY BENCHMARK ───────────────────────────────────────────────────────
+def bench_track(video, frames, stub_ms, encoder, workdir):
+    import track
+
+    timer = StageTimer()
+    captures = []
+    open_video = track.open_video
+
+    def timed_open_video(source):
+        cap, width, height, fps, total_frames = open_video(source)
+        captures.append(TimedCapture(cap, timer, max_frames=frames))
+        return captures[-1], width, height, fps, min(total_frames, frames)
+
+    emit_frame = track.emit_frame
+    writers = []   # the AsyncVideoWriter actually used (it may fall back to mp4v)
+
+    def timed_emit_frame(writer, frame, show=False):
+        if not writers:
+            writers.append(writer)
+        ok = emit_frame(writer, frame, show)
+        timer.add("frame_latency", time.perf_counter() - captures[-1].captured_at)
+        return ok
+
+    track.open_video = timed_open_video
+    track.emit_frame = timed_emit_frame
+    track.draw_detections = timer.wrap("overlay", track.draw_detections)
+    track.PROGRESS_INTERVAL = 10 ** 9
+    output = os.path.join(workdir, "bench-tracked.mp4")
+
+    start = time.perf_counter()
+    stats = track.run_sequential(StubModel(timer, stub_ms), video, output, encoder, show=False)
+    elapsed = time.perf_counter() - start       # includes flushing the encoder
+    writer = writers[0] if writers else None
+    used = writer.encoder if writer else encoder
+    if writer and (writer.error is not None or (writer.proc and writer.proc.returncode)):
+        used += " (failed)"
+    return {
+        'frames': stats.frame_count,
+        'seconds': round(elapsed, 2),
+        'fps': round(stats.frame_count / elapsed, 1) if elapsed else 0.0,
+        'encoder': used,
+        'stages': timer.summary(),
+        'output_mb': round(os.path.getsize(output) / 1e6, 2) if os.path.exists(output) else None,
+    }
+
+
+def print_report(name, result):
+    print("\n" + "=" * 60)
+    print(f"{name}: {result['frames']} frames in {result['seconds']}s -> {result['fps']} fps")
+    print("=" * 60)
+    print(f"{'stage':<16}{'mean ms':>10}{'p50 ms':>10}{'p99 ms':>10}{'fps':>10}")
+    for stage, s in result['stages'].items():
+        print(f"{stage:<16}{s.get('mean_ms', ''):>10}{s.get('p50_ms', ''):>10}"
+              f"{s.get('p99_ms', ''):>10}{str(s.get('fps', '')):>10}")
+    for key in ('mjpeg_encode', 'mjpeg_client', 'hls'):
+        if key in result:
+            print(f"{key:<16}{result[key]}")
+    if 'output_mb' in result:
+        print(f"{'output':<16}{result['output_mb']} MB ({result['encoder']})")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Offline bison pipeline benchmark")
+    parser.add_argument("--source", help="video file to use instead of a synthetic one")
+    parser.add_argument("--frames", type=int, default=BENCH_FRAMES, help="frames per benchmark")
+    parser.add_argument("--size", default=f"{BENCH_SIZE[0]}x{BENCH_SIZE[1]}",
+                        help="synthetic video resolution, WxH")
+    parser.add_argument("--fps", type=float, default=BENCH_FPS, help="synthetic video frame rate")
+    parser.add_argument("--bison", type=int, default=BENCH_BISON, help="animals in the synthetic video")
+    parser.add_argument("--stub-ms", type=float, default=STUB_LATENCY_MS,
+                        help="extra per-frame inference time of the stub detector")
+    parser.add_argument("--realtime", action="store_true",
+                        help="pace StreamManager reads to the source fps, like a live RTSP feed")
+    parser.add_argument("--encoder", choices=("ffmpeg", "mp4v"), default="ffmpeg",
+                        help="track.py output encoder")
+    parser.add_argument("--skip-stream", action="store_true", help="skip the StreamManager benchmark")
+    parser.add_argument("--skip-track", action="store_true", help="skip the track.py benchmark")
+    parser.add_argument("--json", help="also write the results to this JSON file")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    workdir = tempfile.mkdtemp(prefix="bison_bench_")
+    json_path = os.path.abspath(args.json) if args.json else None
+    try:
+        if args.source:
+            video = os.path.abspath(args.source)
+        else:
+            video = os.path.join(workdir, "synthetic.avi")
+            width, height = map(int, args.size.lower().split("x"))
+            print(f"Generating {args.frames} synthetic frames ({width}x{height}, "
+                  f"{args.bison} bison)...")
+            make_synthetic_video(video, args.frames, (width, height), args.fps, args.bison)
+
+        # Detection DB, zones/alerts configs and outputs all stay in the scratch dir
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        os.chdir(workdir)
+
+        results = {'source': args.source or 'synthetic', 'stub_ms': args.stub_ms}
+        if not args.skip_stream:
+            results['stream_manager'] = bench_stream_manager(video, args.frames, args.stub_ms,
+                                                             args.realtime, workdir)
+            print_report("StreamManager", results['stream_manager'])
+        if not args.skip_track:
+            results['track'] = bench_track(video, args.frames, args.stub_ms, args.encoder, workdir)
+            print_report("track.py", results['track'])
+
+        if json_path:
+            with open(json_path, "w") as f:
+                json.dump(results, f, indent=2)
+            print(f"\nResults saved to: {json_path}")
+    finally:
+        os.chdir(os.path.dirname(os.path.abspath(__file__)))
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,12 +5,24 @@ from nicegui import ui, app
 import plotly.graph_objects as go
 from collections import deque
 import json
+import asyncio
+import httpx
 
-# --- 1. CONFIGURATION AND MOCK DATA STORE ---
-# NOTE: In a real application, the data would be fetched from an external API (e.g., http://localhost:8080/stats)
-# As the backend is not running, we mock the real-time data changes.
+# --- 1. CONFIGURATION AND DATA STORE ---
+# Live data is polled from the tracker API (rtsp_bison_tracker_2.py). Set USE_MOCK_DATA to
+# run the dashboard on simulated data without a tracker.
 
+API_BASE_URL = "http://localhost:8080"
+USE_MOCK_DATA = False
 MAX_HISTORY_POINTS = 50
+UPDATE_INTERVAL = 2.0   # seconds between data updates and on-screen refreshes
+HTTP_TIMEOUT = 3.0      # seconds per request to the tracker
+CONNECT_TIMEOUT = 2.0
+BACKOFF_MIN = 1.0       # first retry delay after a failed poll (seconds)
+BACKOFF_MAX = 30.0      # retry delay cap while the tracker is down
+TREND_SPAN = 7 * 86400  # seconds of history in the Historical Trends chart
+TREND_POINTS = 1000     # trend points, downsampled by the tracker (LTTB)
+TREND_POLL_INTERVAL = 60.0   # seconds between trend refreshes
 live_data = {
     'total_bisons': 0,
     'total_detections': 0,
@@ -22,6 +34,8 @@ live_data = {
 }
 history_data = deque(maxlen=MAX_HISTORY_POINTS)
 bison_count_trace = deque(maxlen=MAX_HISTORY_POINTS)
+# long-range bison count from /history (empty in mock mode); version counts successful fetches
+trend_data = {'x': [], 'y': [], 'version': 0}
 # Mock data for Behavioural Analytics (Hotspot/Tracking history)
 mock_tracking_history = {
     "bison_id_101": [
@@ -36,7 +50,101 @@ mock_tracking_history = {
     ]
 }
 
-# --- 2. DATA GENERATION AND MOCK API CALLS ---
+# --- 2. TRACKER CLIENT AND MOCK DATA ---
+class TrackerClient:
+    """
+    Polls the tracker's /stats endpoint on the NiceGUI event loop through one pooled
+    keep-alive httpx.AsyncClient. Every request is bounded by timeouts, and failures back
+    off exponentially with jitter, so a slow or stopped tracker never blocks the UI; the
+    last values stay on screen and the status shows the tracker as offline. A response
+    that is not the expected stats object counts as a failed poll too. Only changes
+    between online and offline are printed, not every retry.
+    """
+    def __init__(self, base_url: str = API_BASE_URL):
+        self.base_url = base_url
+        self.backoff = 0.0
+        self.last_trend = 0.0
+
+    async def run(self):
+        timeout = httpx.Timeout(HTTP_TIMEOUT, connect=CONNECT_TIMEOUT)
+        limits = httpx.Limits(max_connections=1, max_keepalive_connections=1)
+        async with httpx.AsyncClient(base_url=self.base_url, timeout=timeout, limits=limits) as client:
+            while True:
+                started = time.monotonic()
+                try:
+                    resp = await client.get('/stats')
+                    resp.raise_for_status()
+                    was_offline = live_data['stream_status'] == 'Tracker offline'
+                    apply_stats(resp.json())
+                    if was_offline:
+                        print("Tracker back online")
+                    if started - self.last_trend >= TREND_POLL_INTERVAL:
+                        self.last_trend = started
+                        await self.fetch_trend(client)
+                    self.backoff = 0.0
+                    delay = UPDATE_INTERVAL - (time.monotonic() - started)
+                except (httpx.HTTPError, ValueError, TypeError, AttributeError, KeyError) as e:
+                    if live_data['stream_status'] != 'Tracker offline':
+                        print(f"Tracker offline ({e!r}); retrying with backoff up to {BACKOFF_MAX:.0f}s")
+                    live_data['stream_status'] = 'Tracker offline'
+                    # exponential backoff with "equal jitter" so restarted dashboards don't poll in lockstep
+                    self.backoff = min(BACKOFF_MAX, max(BACKOFF_MIN, self.backoff * 2))
+                    delay = self.backoff / 2 + random.uniform(0, self.backoff / 2)
+                await asyncio.sleep(max(0.0, delay))
+
+    async def fetch_trend(self, client):
+        """
+        Bison count over the last TREND_SPAN, reduced to TREND_POINTS by the tracker.
+        Failures only keep the previous trend until the next TREND_POLL_INTERVAL; they
+        don't affect the live status or the /stats backoff.
+        """
+        try:
+            resp = await client.get('/history', params={
+                'from': f'{time.time() - TREND_SPAN:.0f}', 'res': 'auto', 'points': TREND_POINTS})
+            resp.raise_for_status()
+            history = resp.json()
+            rows = [(datetime.datetime.fromtimestamp(t), round(c, 2))
+                    for t, c in zip(history.get('t', []), history.get('count', [])) if c is not None]
+        except (httpx.HTTPError, ValueError, TypeError, AttributeError, KeyError) as e:
+            print(f"Trend fetch failed ({e!r}); keeping the previous trend")
+            return
+        trend_data['x'] = [t for t, _ in rows]
+        trend_data['y'] = [c for _, c in rows]
+        trend_data['version'] += 1
+
+
+def apply_stats(stats: dict):
+    """
+    Copies one /stats response into live_data and the rolling history. All fields are
+    converted before anything is assigned, so a malformed response raises without
+    leaving live_data half updated.
+    """
+    now = datetime.datetime.now()
+    count = int(stats.get('bison_count', 0))
+    total_detections = int(stats.get('total_detections', 0))
+    avg_confidence = round(float(stats.get('avg_confidence', 0.0)), 3)
+    fps = round(float(stats.get('fps', 0.0)), 1)
+
+    live_data['total_bisons'] = count
+    live_data['total_detections'] = total_detections
+    live_data['avg_confidence'] = avg_confidence
+    live_data['fps'] = fps
+    live_data['stream_status'] = 'LIVE'
+    live_data['last_updated'] = now.strftime('%Y-%m-%d %H:%M:%S')
+    # The tracker's model only reports bison
+    live_data['detection_counts'] = {'bison': count}
+
+    history_data.append({
+        'timestamp': now.strftime('%H:%M:%S'),
+        'total_bisons': count,
+        'fps': live_data['fps'],
+        'detections': live_data['total_detections'],
+    })
+    bison_count_trace.append((now, count))
+
+
+tracker_client = TrackerClient()
+
 def generate_mock_data():
     """Simulates fetching real-time data from the tracker's API."""
     now = datetime.datetime.now()
@@ -166,21 +274,38 @@ def render_detection_chart():
         'backgroundColor': '#1c1e2b'
     }
 
-    ui.echart(options=option).classes('w-full h-80 bg-gray-900 rounded-lg p-4')
+    return ui.echart(options=option).classes('w-full h-80 bg-gray-900 rounded-lg p-4')
+
+def update_detection_chart(chart):
+    """Pushes the latest counts into an existing detections chart (data only, no rebuild)."""
+    chart.options['xAxis']['data'] = list(live_data['detection_counts'].keys())
+    chart.options['series'][0]['data'] = list(live_data['detection_counts'].values())
+    chart.update()
+
+def recent_counts():
+    """Live counts newer than the last long-range trend point (all of them until a trend arrives)."""
+    since = trend_data['x'][-1] if trend_data['x'] else None
+    recent = [t for t in bison_count_trace if since is None or t[0] > since]
+    return [t[0] for t in recent], [t[1] for t in recent]
 
 def render_bison_count_plot():
-    """Renders the Plotly line chart for Bison Count Trend."""
-    
-    x_data = [t[0] for t in bison_count_trace]
-    y_data = [t[1] for t in bison_count_trace]
+    """
+    Renders the Plotly line chart for Bison Count Trend: trace 0 is the downsampled
+    long-range trend, trace 1 the live counts since its last point.
+    """
+    x_recent, y_recent = recent_counts()
 
     fig = go.Figure(
         data=[go.Scatter(
-            x=x_data,
-            y=y_data,
-            mode='lines+markers',
+            x=trend_data['x'],
+            y=trend_data['y'],
+            mode='lines',
             line={'color': '#a78bfa', 'width': 2},
-            marker={'size': 8, 'symbol': 'circle', 'color': '#c4b5fd'},
+        ), go.Scatter(
+            x=x_recent,
+            y=y_recent,
+            mode='lines',
+            line={'color': '#c4b5fd', 'width': 2},
         )]
     )
     fig.update_layout(
@@ -191,33 +316,74 @@ def render_bison_count_plot():
         plot_bgcolor='rgba(0,0,0,0)',
         paper_bgcolor='rgba(0,0,0,0)',
         font={'color': '#e5e7eb'},
-        margin={'l': 40, 'r': 10, 't': 40, 'b': 40}
+        margin={'l': 40, 'r': 10, 't': 40, 'b': 40},
+        showlegend=False
     )
     
-    # Update axis to prevent Plotly from drawing the full date/time
-    fig.update_xaxes(tickformat="%H:%M:%S")
-    
-    ui.plotly(fig).classes('w-full h-96')
+    # A plain dict lets later updates swap the trace data without re-serialising the figure object
+    return ui.plotly(fig.to_plotly_json()).classes('w-full h-96')
+
+def update_bison_count_plot(plot, shown_version):
+    """
+    Updates an existing trend chart in place. The long-range trace is resent only when
+    trend_data has a new version; otherwise only the short live trace is restyled.
+    Returns the trend version now shown.
+    """
+    live = plot.figure['data'][1]
+    live['x'], live['y'] = recent_counts()
+    if shown_version != trend_data['version']:
+        plot.figure['data'][0].update(x=trend_data['x'], y=trend_data['y'])
+        plot.update()
+    else:
+        plot.run_plot_method('restyle', {'x': [live['x']], 'y': [live['y']]}, [1])
+    return trend_data['version']
+
+def video_feed_html(last_updated: str) -> str:
+    """Markup for the live video placeholder, stamped with the last update time."""
+    return f"""
+        <div class="relative w-full h-auto rounded-lg overflow-hidden shadow-2xl">
+            <img src="https://placehold.co/800x450/111827/e6edf3?text=Live+Video+Feed\\nSimulated+@+{last_updated}" 
+                 class="w-full h-auto object-cover" alt="Live Video Feed Placeholder">
+            <div class="absolute bottom-0 right-0 p-2 bg-purple-700/80 text-white text-xs rounded-tl-lg">
+                Tracking LIVE
+            </div>
+        </div>
+    """
+
+def live_updates(update):
+    """
+    Runs `update` every UPDATE_INTERVAL seconds for the current client only.
+    The timer pauses while the browser tab is hidden and catches up when it is shown again.
+    """
+    timer = ui.timer(UPDATE_INTERVAL, update, immediate=False)
+
+    def on_visibility(e):
+        visible = e.args == 'visible'
+        if visible and not timer.active:
+            update()
+        timer.active = visible
+
+    ui.on('tab_visibility', on_visibility)
 
 # --- 4. NICEGUI PAGES ---
 
-# Set up the custom dark theme
-ui.page_title('Bison Guard Tracker')
-ui.add_head_html('<style>body { background: #0f172a; color: #e2e8f0; font-family: Inter, sans-serif; }</style>')
+# Set up the custom dark theme (shared by every page)
+ui.add_head_html('<style>body { background: #0f172a; color: #e2e8f0; font-family: Inter, sans-serif; }</style>', shared=True)
+# Report tab visibility to the server so hidden tabs stop receiving updates
+ui.add_head_html("""<script>
+document.addEventListener('visibilitychange', () => emitEvent('tab_visibility', document.visibilityState));
+</script>""", shared=True)
 
-# Refreshable component for dynamic data updates on all pages
-@ui.refreshable
 def dashboard_content(page_type: str):
-    """This function is called by the timer and updates all dynamic elements."""
-    # 1. Update KPI cards on Overview
+    """
+    Builds the page content once for this client. Labels follow live_data through bindings;
+    charts and tables are updated in place by a per-client timer on the pages that need one.
+    """
+    # 1. KPI cards, video feed and counts on Overview
     if page_type == '/':
-        for key in ['total_bisons', 'fps', 'total_detections', 'avg_confidence']:
-            # Force re-render of the elements bound to live_data (handled by ui.refreshable)
-            pass 
-        
         with ui.column().classes('w-full gap-6'):
             with ui.row().classes('w-full justify-around gap-6'):
-                # Refresh KPI cards by simply calling the components again (NiceGUI handles diffing)
+                # KPI values are bound to live_data, so they update without rebuilding the cards
                 kpi_card('Live Bison Count', 'total_bisons', 'Bisons', 'text-green-400')
                 kpi_card('Processing FPS', 'fps', 'FPS', 'text-blue-400')
                 kpi_card('Total Detections', 'total_detections', '', 'text-purple-400')
@@ -228,27 +394,20 @@ def dashboard_content(page_type: str):
                     ui.label('Live Video Feed (RTSP Placeholder)').classes('text-xl font-semibold mb-2 text-purple-300')
                     # Placeholder for the live MJPEG stream from the tracker backend
                     # In a real setup, this would point to: http://localhost:8080/mjpeg
-                    ui.html(f"""
-                        <div class="relative w-full h-auto rounded-lg overflow-hidden shadow-2xl">
-                            <img src="https://placehold.co/800x450/111827/e6edf3?text=Live+Video+Feed\\nSimulated+@+{live_data['last_updated']}" 
-                                 class="w-full h-auto object-cover" alt="Live Video Feed Placeholder">
-                            <div class="absolute bottom-0 right-0 p-2 bg-purple-700/80 text-white text-xs rounded-tl-lg">
-                                Tracking LIVE
-                            </div>
-                        </div>
-                    """).classes('w-full')
+                    ui.html().bind_content_from(live_data, 'last_updated', backward=video_feed_html).classes('w-full')
                 
                 with ui.card().classes('col-span-1 p-4 shadow-xl bg-gray-800/50'):
                     ui.label('Live Classification Counts').classes('text-xl font-semibold mb-2 text-purple-300')
-                    # Re-render the chart with new data
-                    render_detection_chart()
+                    chart = render_detection_chart()
+
+        live_updates(lambda: update_detection_chart(chart))
 
-    # 2. Update Charts/Tables on Historical Trends
+    # 2. Trend chart and history table on Historical Trends
     elif page_type == '/trends':
         with ui.column().classes('w-full gap-6'):
             with ui.card().classes('w-full p-4 shadow-xl bg-gray-800/50'):
                 ui.label('Bison Population Trend').classes('text-xl font-semibold mb-2 text-purple-300')
-                render_bison_count_plot()
+                plot = render_bison_count_plot()
 
             with ui.card().classes('w-full p-4 shadow-xl bg-gray-800/50'):
                 ui.label('Recent Tracking History').classes('text-xl font-semibold mb-2 text-purple-300')
@@ -261,9 +420,17 @@ def dashboard_content(page_type: str):
                     {'name': 'detections', 'label': 'Total Detections', 'field': 'detections', 'align': 'center'},
                 ]
                 # Use a reversed list for "Recent" history
-                ui.table(columns=table_cols, rows=list(history_data)[::-1]).classes('w-full max-h-96 overflow-y-auto')
+                table = ui.table(columns=table_cols, rows=list(history_data)[::-1]).classes('w-full max-h-96 overflow-y-auto')
+
+        shown = {'version': trend_data['version']}
+
+        def update_trends():
+            shown['version'] = update_bison_count_plot(plot, shown['version'])
+            table.rows = list(history_data)[::-1]
+
+        live_updates(update_trends)
     
-    # 3. Update Content on Behaviour Analytics
+    # 3. Behaviour Analytics (static apart from the bound sidebar labels, so no timer)
     elif page_type == '/analytics':
         with ui.column().classes('w-full gap-6'):
             ui.label('Bison Behavioural Analysis').classes('text-3xl font-bold text-purple-300')
@@ -338,9 +505,13 @@ def trends_page():
 
 # --- 5. INITIALIZATION AND LIVE REFRESH ---
 
-# Initialize data and set up timer
-generate_mock_data()
-ui.timer(interval=2.0, callback=lambda: (generate_mock_data(), dashboard_content.refresh('/')))
+# Update the shared data from one app-wide task; pages pick the changes up through
+# their bindings and per-client timers, so nothing is rebuilt here
+if USE_MOCK_DATA:
+    generate_mock_data()
+    app.timer(UPDATE_INTERVAL, generate_mock_data)
+else:
+    app.on_startup(tracker_client.run)
 
 # Run the NiceGUI app
 ui.run(storage_secret='my_secret_key', dark=True, title='Bison Guard Tracker Dashboard', port=8000)
@@ -9,14 +9,19 @@ import math
 import queue
 import shutil
 import signal
+import sqlite3
 import threading
 import subprocess
 import tempfile
 import webbrowser
-from http.server import HTTPServer, BaseHTTPRequestHandler
-from urllib.parse import urlparse
+import urllib.request
+from collections import OrderedDict, deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
 import sys
 
+import numpy as np
+
 try:
     from ultralytics import YOLO
     YOLO_AVAILABLE = True
@@ -35,10 +40,55 @@ MJPEG_QUALITY = 85
 HLS_SEGMENT_TIME = 2         # seconds
 HLS_LIST_SIZE = 6            # rolling window size
 HLS_DELETE_OLD = True
+HLS_MAX_PACING_LAG = 1.0     # seconds behind schedule before the pacer resyncs
+HISTORY_RAW_FRAMES = 32768   # per-frame ring (~20 min at 25 fps)
+HISTORY_CAPACITY = {         # rollup buckets kept per resolution
+    '1s': 86400,             # 1 day
+    '1m': 40320,             # 4 weeks
+    '1h': 8760,              # 1 year
+}
+HISTORY_DEFAULT_SPAN = 3600  # seconds returned by /history when "from" is omitted
+HISTORY_MAX_POINTS = 5000    # upper bound for /history?points=N (LTTB downsampling)
+DOWNSAMPLE_CACHE_SIZE = 64   # downsampled /history results kept (least recently used evicted)
+DOWNSAMPLE_CACHE_TTL = 30.0  # seconds a cached result covering "now" may lag new samples
+DETECTION_DB = "detections.db"   # durable detection log (SQLite, WAL mode)
+DETECTION_BATCH_ROWS = 500       # rows per write transaction
+DETECTION_FLUSH_INTERVAL = 1.0   # seconds before a partial batch is written
+DETECTION_QUEUE_FRAMES = 2000    # frames buffered for the writer before dropping
+DETECTION_QUERY_LIMIT = 100000   # max rows returned by /detections
+TRACK_RETENTION = 600        # seconds a lost track's trajectory is kept
+TRACK_MAX_POINTS = 2048      # per-track points before older history is compacted
+HEATMAP_GRID = (32, 18)      # hotspot histogram resolution (columns, rows)
+HEATMAP_HALF_LIFE = 600.0    # seconds for an old centroid's weight to halve
+ZONES_CFG = "zones.json"     # optional zone polygons / counting lines (normalized coords)
+ZONE_MASK_DOWNSCALE = 4      # zone label mask is built at 1/N of the frame resolution
+BEHAVIOUR_WINDOW = 5.0       # seconds of movement used to classify activity
+BEHAVIOUR_REST_SPEED = 0.05  # body lengths / s below which an animal may be resting
+BEHAVIOUR_REST_DWELL = 30.0  # seconds without leaving the dwell radius to count as resting
+BEHAVIOUR_WALK_SPEED = 0.3   # body lengths / s at or above which an animal is walking
+BEHAVIOUR_DWELL_RADIUS = 0.5 # body lengths an animal may drift while still dwelling
+ALERTS_CFG = "alerts.json"   # optional alert rules + webhook URL
+ALERT_HISTORY = 200          # alerts kept for /alerts
+ALERT_WEBHOOK_TIMEOUT = 2.0  # seconds per webhook POST
+CLIPS_DIR = "clips"          # event clips (MP4, stream-copied from HLS segments)
+CLIP_PRE_ROLL = 10.0         # seconds of video kept before an alert
+CLIP_POST_ROLL = 10.0        # seconds of video recorded after an alert
+CONF_WINDOW = 2000           # most recent detections in the sliding confidence window
+CONF_HIST_BINS = 1000        # quantile sketch resolution over [0, 1] (0.001 steps)
+DISTINCT_WINDOWS = {         # rolling windows for distinct track-ID counts (seconds)
+    'last_minute': 60,
+    'last_hour': 3600,
+    'last_day': 86400,
+}
+DISTINCT_MAX_IDS = 100000    # hard cap on IDs remembered per window
 # ──────────────────────────────────────────────────────────────────────────────
 
 
 # ─── UTILITIES ────────────────────────────────────────────────────────────────
+# Per-frame detections are (N, 6) arrays: x1, y1, x2, y2, conf, track_id (-1 = none)
+NO_DETECTIONS = np.zeros((0, 6), dtype=np.float64)
+
+
 def which(cmd: str) -> bool:
     """Return True if executable is on PATH."""
     return shutil.which(cmd) is not None
@@ -70,6 +120,12 @@ class HLSManager:
         self.writer_thread = None
         self.running = False
 
+        # pacing counters: ffmpeg is told "-r fps", so the writer emits exactly
+        # one frame per tick and repeats/drops frames to hold that rate
+        self.frames_written = 0
+        self.frames_duplicated = 0
+        self.frames_dropped = 0
+
     def start(self):
         if not self.enabled:
             print("HLS disabled: ffmpeg not found on PATH.")
@@ -94,6 +150,10 @@ class HLSManager:
             "-c:v", "libx264",
             "-preset", "veryfast",
             "-tune", "zerolatency",
+            # keyframe at every segment boundary so segments (and clips cut
+            # from them) start on a keyframe and have the requested length
+            "-g", str(max(1, round(self.fps * self.segment_time))),
+            "-sc_threshold", "0",
             "-pix_fmt", "yuv420p",
             "-f", "hls",
             "-hls_time", str(self.segment_time),
@@ -123,21 +183,60 @@ class HLSManager:
         return True
 
     def _writer_loop(self):
+        """
+        Feed ffmpeg at exactly self.fps. On every tick the newest queued frame
+        is written; older queued frames are dropped, and if nothing new arrived
+        the previous frame is repeated, so segment timestamps track wall time.
+        """
+        interval = 1.0 / self.fps
+        last_frame = None
+        next_tick = None
+
         while self.running and self.proc and (self.proc.poll() is None):
-            try:
-                frame = self.frame_q.get(timeout=0.3)
-            except queue.Empty:
-                continue
+            frame = None
+            if last_frame is None:
+                # Nothing to repeat yet: block until the first frame arrives
+                try:
+                    frame = self.frame_q.get(timeout=0.3)
+                except queue.Empty:
+                    continue
+                next_tick = time.monotonic()
+
+            # Keep only the newest frame queued since the last tick
+            while True:
+                try:
+                    newer = self.frame_q.get_nowait()
+                except queue.Empty:
+                    break
+                if frame is not None:
+                    self.frames_dropped += 1
+                frame = newer
+
+            if frame is None:
+                frame = last_frame
+                self.frames_duplicated += 1
 
             try:
                 # Write raw frame bytes (BGR24)
                 with self.stdin_lock:
                     if self.proc and self.proc.stdin and (self.proc.poll() is None):
                         self.proc.stdin.write(frame.tobytes())
+                        self.frames_written += 1
             except Exception as e:
                 # If ffmpeg died or write failed, stop gracefully
                 print(f"HLS writer error: {e}")
                 break
+            last_frame = frame
+
+            next_tick += interval
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            elif delay < -HLS_MAX_PACING_LAG:
+                # Too far behind to catch up by repeating frames; resync the
+                # clock and account for the ticks we skipped as dropped frames.
+                self.frames_dropped += int(-delay / interval)
+                next_tick = time.monotonic()
 
         self._close_proc()
 
@@ -149,14 +248,30 @@ class HLSManager:
         try:
             self.frame_q.put_nowait(frame)
         except queue.Full:
-            # Drop frame silently
-            pass
+            self.frames_dropped += 1
 
     def get_playlist_path(self):
         if self.tmpdir:
             return os.path.join(self.tmpdir, self.playlist_name)
         return None
 
+    def finished_segments(self):
+        """(path, duration) of the segments currently listed in the playlist, oldest first."""
+        playlist = self.get_playlist_path()
+        if not playlist or not os.path.exists(playlist):
+            return []
+        segments = []
+        duration = None
+        with open(playlist, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line.startswith('#EXTINF:'):
+                    duration = float(line[len('#EXTINF:'):].split(',')[0])
+                elif line and not line.startswith('#') and duration is not None:
+                    segments.append((os.path.join(self.tmpdir, line), duration))
+                    duration = None
+        return segments
+
     def resolve_path(self, name):
         """Resolve a requested file within the HLS tmpdir safely."""
         if not self.tmpdir:
@@ -217,6 +332,1157 @@ class HLSManager:
                 self.proc = None
 
 
+# ─── TIME-SERIES HISTORY ──────────────────────────────────────────────────────
+class _SeriesRing:
+    """
+    Ring of preallocated NumPy columns. With bucket=None every sample gets its
+    own slot (raw per-frame history); otherwise samples falling into the same
+    bucket of `bucket` seconds are accumulated into one slot.
+    """
+    COLUMNS = ('n', 'count_sum', 'count_max', 'conf_sum', 'conf_n',
+               'fps_sum', 'latency_sum', 'latency_max')
+
+    def __init__(self, capacity: int, bucket=None):
+        self.capacity = int(capacity)
+        self.bucket = bucket
+        self.head = -1
+        self.size = 0
+        self.t = np.zeros(self.capacity, dtype=np.float64)
+        for name in self.COLUMNS:
+            setattr(self, name, np.zeros(self.capacity, dtype=np.float64))
+
+    def _advance(self, t):
+        self.head = (self.head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        self.t[self.head] = t
+        for name in self.COLUMNS:
+            getattr(self, name)[self.head] = 0.0
+
+    def add(self, t, count, conf_sum, conf_n, fps, latency):
+        if self.bucket is None:
+            self._advance(t)
+        else:
+            start = math.floor(t / self.bucket) * self.bucket
+            # Late samples (clock steps backwards) fold into the current bucket
+            if self.size == 0 or start > self.t[self.head]:
+                self._advance(start)
+        i = self.head
+        self.n[i] += 1
+        self.count_sum[i] += count
+        self.count_max[i] = max(self.count_max[i], count)
+        self.conf_sum[i] += conf_sum
+        self.conf_n[i] += conf_n
+        self.fps_sum[i] += fps
+        self.latency_sum[i] += latency
+        self.latency_max[i] = max(self.latency_max[i], latency)
+
+    def query(self, t_from, t_to):
+        """Return columns for slots with t_from <= t <= t_to, oldest first."""
+        idx = (self.head - self.size + 1 + np.arange(self.size)) % self.capacity
+        ts = self.t[idx]
+        idx = idx[(ts >= t_from) & (ts <= t_to)]
+        n = self.n[idx]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return {
+                't': self.t[idx],
+                'count': self.count_sum[idx] / n,
+                'count_max': self.count_max[idx],
+                'confidence': self.conf_sum[idx] / self.conf_n[idx],
+                'fps': self.fps_sum[idx] / n,
+                'latency': self.latency_sum[idx] / n,
+                'latency_max': self.latency_max[idx],
+                'samples': n,
+            }
+
+
+def lttb_indices(x, y, n):
+    """
+    Largest-Triangle-Three-Buckets: indices of `n` points of (x, y) that keep
+    the visual shape of the series. The first and last points are always
+    kept; every bucket in between contributes the point forming the largest
+    triangle with the previously kept point and the next bucket's average.
+    """
+    size = len(x)
+    if n >= size:
+        return np.arange(size)
+    # n - 2 buckets over the interior points, each at least one point wide
+    edges = np.linspace(1, size - 1, n - 1).astype(np.int64)
+    idx = np.empty(n, dtype=np.int64)
+    idx[0], idx[-1] = 0, size - 1
+    a = 0
+    for i in range(n - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if i + 2 < n - 1:
+            nxt = slice(edges[i + 1], edges[i + 2])
+            cx, cy = x[nxt].mean(), y[nxt].mean()
+        else:
+            cx, cy = x[-1], y[-1]
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(area.argmax())
+        idx[i + 1] = a
+    return idx
+
+
+class TimeSeriesStore:
+    """
+    Fixed-memory history of per-frame stats (bison count, detection
+    confidence, fps, processing latency) with 1 s / 1 min / 1 h rollups.
+    """
+    RESOLUTIONS = {'1s': 1, '1m': 60, '1h': 3600}
+
+    def __init__(self, raw_frames=HISTORY_RAW_FRAMES, capacity=None):
+        capacity = capacity or HISTORY_CAPACITY
+        self.lock = threading.Lock()
+        self.rings = {'raw': _SeriesRing(raw_frames)}
+        for res, seconds in self.RESOLUTIONS.items():
+            self.rings[res] = _SeriesRing(capacity[res], bucket=seconds)
+        self.cache_lock = threading.Lock()
+        self.downsampled = OrderedDict()   # key -> (expires, columns, source_points)
+
+    def record(self, t, count, conf_sum, conf_n, fps, latency):
+        with self.lock:
+            for ring in self.rings.values():
+                ring.add(t, count, conf_sum, conf_n, fps, latency)
+
+    def query(self, t_from, t_to, res='1s'):
+        """Columnar history for [t_from, t_to] at resolution `res`."""
+        if res not in self.rings:
+            raise ValueError(f"Unknown resolution: {res}")
+        with self.lock:
+            return self.rings[res].query(t_from, t_to)
+
+    def resolve(self, res, t_from, now=None):
+        """'auto' -> the finest rollup whose retention still reaches back to t_from."""
+        if res != 'auto':
+            return res
+        age = (now or time.time()) - t_from
+        for name, seconds in self.RESOLUTIONS.items():
+            if self.rings[name].capacity * seconds >= age:
+                return name
+        return '1h'
+
+    def query_downsampled(self, t_from, t_to, res='1s', points=1000, y='count'):
+        """
+        query() reduced to at most `points` rows by LTTB on column `y`; every
+        column is sampled at the chosen rows. The range is snapped outwards to
+        whole output buckets so repeated requests for the same window share a
+        cached result. Ranges reaching the present expire after
+        DOWNSAMPLE_CACHE_TTL; ranges entirely in the past no longer change.
+        Returns (columns, number of rows before downsampling).
+        """
+        if res not in self.rings:
+            raise ValueError(f"Unknown resolution: {res}")
+        if not 3 <= points <= HISTORY_MAX_POINTS:
+            raise ValueError(f"points must be between 3 and {HISTORY_MAX_POINTS}")
+        step = max(self.RESOLUTIONS.get(res, 0), (t_to - t_from) / points, 1e-3)
+        lo = math.floor(t_from / step) * step
+        hi = math.ceil(t_to / step) * step
+        key = (res, points, y, round(lo, 3), round(hi, 3))
+        now = time.time()
+        with self.cache_lock:
+            hit = self.downsampled.get(key)
+            if hit and hit[0] > now:
+                self.downsampled.move_to_end(key)
+                return hit[1], hit[2]
+
+        columns = self.query(lo, hi, res)
+        if y not in columns or y == 't':
+            raise ValueError(f"Unknown column: {y}")
+        source_points = len(columns['t'])
+        if source_points > points:
+            idx = lttb_indices(columns['t'], np.nan_to_num(columns[y]), points)
+            columns = {name: values[idx] for name, values in columns.items()}
+
+        # Late samples fold into the newest bucket, so only a range touching it can still change
+        expires = now + DOWNSAMPLE_CACHE_TTL if hi + self.RESOLUTIONS.get(res, 0) >= now else math.inf
+        with self.cache_lock:
+            self.downsampled[key] = (expires, columns, source_points)
+            self.downsampled.move_to_end(key)
+            while len(self.downsampled) > DOWNSAMPLE_CACHE_SIZE:
+                self.downsampled.popitem(last=False)
+        return columns, source_points
+
+    @staticmethod
+    def to_json(columns):
+        """Convert query() columns to JSON-safe lists (NaN -> null)."""
+        out = {}
+        for name, values in columns.items():
+            digits = 3 if name == 't' else 4
+            out[name] = [None if v != v else round(v, digits) for v in values.tolist()]
+        return out
+
+
+# ─── DETECTION LOG (SQLITE) ───────────────────────────────────────────────────
+class DetectionLog:
+    """
+    Durable, append-only log of per-frame detections in SQLite (WAL mode).
+    record() only enqueues; a background thread writes rows in batched
+    transactions, so the capture/inference loop never waits on disk.
+    Rows are indexed by time for range queries.
+    A session started with a key (e.g. a video file's fingerprint) is shared
+    by every run with that key, and each of its frames is written only once,
+    so replays and resumed runs do not duplicate rows.
+    """
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS sessions ("
+        " id INTEGER PRIMARY KEY, source TEXT, started REAL, key TEXT)",
+        "CREATE TABLE IF NOT EXISTS detections ("
+        " t REAL NOT NULL, frame INTEGER NOT NULL, session INTEGER NOT NULL,"
+        " track_id INTEGER, x1 REAL, y1 REAL, x2 REAL, y2 REAL, conf REAL)",
+        "CREATE TABLE IF NOT EXISTS logged_frames ("
+        " session INTEGER NOT NULL, frame INTEGER NOT NULL,"
+        " PRIMARY KEY (session, frame)) WITHOUT ROWID",
+        "CREATE INDEX IF NOT EXISTS idx_detections_t ON detections(t)",
+        "CREATE INDEX IF NOT EXISTS idx_detections_track ON detections(track_id, t)",
+    )
+
+    def __init__(self, path=DETECTION_DB, batch_rows=DETECTION_BATCH_ROWS,
+                 flush_interval=DETECTION_FLUSH_INTERVAL, drop_when_full=True):
+        self.path = path
+        self.batch_rows = int(batch_rows)
+        self.flush_interval = float(flush_interval)
+        self.drop_when_full = drop_when_full
+        self.q = queue.Queue(maxsize=DETECTION_QUEUE_FRAMES)
+        self.session = None
+        self.key = None
+        self.writer_thread = None
+        self.rows_written = 0
+        self.frames_dropped = 0
+
+    def start(self, source="", key=None):
+        conn = self._connect()
+        try:
+            with conn:
+                for stmt in self.SCHEMA:
+                    conn.execute(stmt)
+                # logs created before sessions had a key column
+                if "key" not in [row[1] for row in conn.execute("PRAGMA table_info(sessions)")]:
+                    conn.execute("ALTER TABLE sessions ADD COLUMN key TEXT")
+                conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_sessions_key ON sessions(key)")
+                if key is None:
+                    cur = conn.execute("INSERT INTO sessions (source, started) VALUES (?, ?)",
+                                       (str(source), time.time()))
+                    self.session = cur.lastrowid
+                else:
+                    conn.execute("INSERT OR IGNORE INTO sessions (source, started, key) VALUES (?, ?, ?)",
+                                 (str(source), time.time(), key))
+                    self.session = conn.execute("SELECT id FROM sessions WHERE key = ?",
+                                                (key,)).fetchone()[0]
+        finally:
+            conn.close()
+        self.key = key
+        self.writer_thread = threading.Thread(target=self._writer_loop, daemon=True)
+        self.writer_thread.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def record(self, t, frame_idx, detections):
+        """Queue one frame's detections: array of rows (x1, y1, x2, y2, conf, track_id or -1)."""
+        if self.writer_thread is None or len(detections) == 0:
+            return
+        item = (t, frame_idx, detections)
+        if not self.drop_when_full:
+            self.q.put(item)
+            return
+        try:
+            self.q.put_nowait(item)
+        except queue.Full:
+            self.frames_dropped += 1
+
+    def _writer_loop(self):
+        conn = self._connect()
+        batch = []
+        last_flush = time.monotonic()
+        stopping = False
+        while not stopping:
+            try:
+                item = self.q.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = ()
+            if item is None:
+                stopping = True
+            elif item:
+                t, frame_idx, detections = item
+                for x1, y1, x2, y2, conf, tid in np.asarray(detections).tolist():
+                    batch.append((t, frame_idx, self.session,
+                                  int(tid) if tid >= 0 else None, x1, y1, x2, y2, conf))
+
+            if batch and (stopping or len(batch) >= self.batch_rows
+                          or time.monotonic() - last_flush >= self.flush_interval):
+                try:
+                    with conn:
+                        if self.key is not None:
+                            batch = self._unlogged(conn, batch)
+                        conn.executemany(
+                            "INSERT INTO detections (t, frame, session, track_id, x1, y1, x2, y2, conf)"
+                            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", batch)
+                    self.rows_written += len(batch)
+                except sqlite3.Error as e:
+                    print(f"Detection log write error: {e}")
+                batch = []
+                last_flush = time.monotonic()
+        conn.close()
+
+    def _unlogged(self, conn, batch):
+        """Rows of the frames this keyed session has not logged yet; claims those frames."""
+        new = set()
+        for frame_idx in {row[1] for row in batch}:
+            cur = conn.execute("INSERT OR IGNORE INTO logged_frames (session, frame) VALUES (?, ?)",
+                               (self.session, frame_idx))
+            if cur.rowcount:
+                new.add(frame_idx)
+        return [row for row in batch if row[1] in new]
+
+    def query(self, t_from, t_to, limit=DETECTION_QUERY_LIMIT):
+        """Rows with t_from <= t <= t_to, oldest first (uses the time index)."""
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            return conn.execute(
+                "SELECT t, frame, track_id, x1, y1, x2, y2, conf FROM detections"
+                " WHERE t BETWEEN ? AND ? ORDER BY t LIMIT ?",
+                (t_from, t_to, int(limit))).fetchall()
+        finally:
+            conn.close()
+
+    def stop(self):
+        """Flush pending rows and stop the writer thread."""
+        if self.writer_thread is None:
+            return
+        self.q.put(None)
+        self.writer_thread.join(timeout=10)
+        self.writer_thread = None
+
+
+# ─── TRACK TRAJECTORIES ───────────────────────────────────────────────────────
+class _Trajectory:
+    """Centroid path of one track ID in growable NumPy arrays."""
+    INITIAL_CAPACITY = 64
+
+    def __init__(self, track_id, t):
+        self.track_id = track_id
+        self.first_seen = t
+        self.last_seen = t
+        self.size = 0
+        self.compactions = 0
+        self.t = np.empty(self.INITIAL_CAPACITY, dtype=np.float64)
+        self.xy = np.empty((self.INITIAL_CAPACITY, 2), dtype=np.float32)
+
+    def append(self, t, cx, cy):
+        if self.size == len(self.t):
+            if len(self.t) < TRACK_MAX_POINTS:
+                self._grow(min(len(self.t) * 2, TRACK_MAX_POINTS))
+            else:
+                self._compact()
+        self.t[self.size] = t
+        self.xy[self.size] = (cx, cy)
+        self.size += 1
+        self.last_seen = t
+
+    def _grow(self, capacity):
+        t = np.empty(capacity, dtype=np.float64)
+        xy = np.empty((capacity, 2), dtype=np.float32)
+        t[:self.size] = self.t[:self.size]
+        xy[:self.size] = self.xy[:self.size]
+        self.t, self.xy = t, xy
+
+    def _compact(self):
+        """
+        Halve the resolution of the older half of the path. Recent movement
+        stays at full rate; repeated compactions thin out old history, so a
+        long-lived track never exceeds TRACK_MAX_POINTS.
+        """
+        half = self.size // 2
+        keep = np.arange(0, half, 2)
+        n_old = len(keep)
+        n_new = self.size - half
+        self.t[:n_old] = self.t[keep]
+        self.xy[:n_old] = self.xy[keep]
+        self.t[n_old:n_old + n_new] = self.t[half:self.size]
+        self.xy[n_old:n_old + n_new] = self.xy[half:self.size]
+        self.size = n_old + n_new
+        self.compactions += 1
+
+    def summary(self):
+        x, y = self.xy[self.size - 1].tolist()
+        return {
+            'id': self.track_id,
+            'first_seen': round(self.first_seen, 3),
+            'last_seen': round(self.last_seen, 3),
+            'points': self.size,
+            'x': round(x, 1),
+            'y': round(y, 1),
+        }
+
+    def to_json(self):
+        payload = self.summary()
+        payload['t'] = np.round(self.t[:self.size], 3).tolist()
+        payload['path_x'] = np.round(self.xy[:self.size, 0], 1).tolist()
+        payload['path_y'] = np.round(self.xy[:self.size, 1], 1).tolist()
+        return payload
+
+
+class TrackStore:
+    """
+    Per-track-ID trajectories (box centroids) fed from ByteTrack IDs.
+    Tracks not seen for `retention` seconds are dropped.
+    """
+    def __init__(self, retention=TRACK_RETENTION):
+        self.retention = float(retention)
+        self.tracks = {}
+        self.lock = threading.Lock()
+        self._last_expiry = 0.0
+
+    def update(self, t, detections):
+        with self.lock:
+            for x1, y1, x2, y2, _conf, tid in detections.tolist():
+                if tid < 0:
+                    continue
+                tid = int(tid)
+                traj = self.tracks.get(tid)
+                if traj is None:
+                    traj = self.tracks[tid] = _Trajectory(tid, t)
+                traj.append(t, (x1 + x2) / 2.0, (y1 + y2) / 2.0)
+            if t - self._last_expiry >= 1.0:
+                self._expire(t)
+
+    def _expire(self, now):
+        cutoff = now - self.retention
+        for tid in [tid for tid, traj in self.tracks.items() if traj.last_seen < cutoff]:
+            del self.tracks[tid]
+        self._last_expiry = now
+
+    def list_tracks(self):
+        with self.lock:
+            return [traj.summary() for traj in self.tracks.values()]
+
+    def get(self, track_id):
+        with self.lock:
+            traj = self.tracks.get(track_id)
+            return traj.to_json() if traj else None
+
+
+# ─── HOTSPOT HEATMAP ──────────────────────────────────────────────────────────
+class HeatmapAccumulator:
+    """
+    2D occupancy histogram of box centroids with exponential time decay.
+    Each frame decays the grid once and bins all centroids in one bincount.
+    """
+    def __init__(self, grid=HEATMAP_GRID, half_life=HEATMAP_HALF_LIFE):
+        self.cols, self.rows = int(grid[0]), int(grid[1])
+        self.half_life = float(half_life)
+        self.grid = np.zeros((self.rows, self.cols), dtype=np.float32)
+        self.last_t = None
+        self.lock = threading.Lock()
+
+    def _decay_factor(self, t):
+        if self.last_t is None or t <= self.last_t:
+            return 1.0
+        return 0.5 ** ((t - self.last_t) / self.half_life)
+
+    def update(self, t, detections, frame_w, frame_h):
+        with self.lock:
+            self.grid *= self._decay_factor(t)
+            self.last_t = t
+            if len(detections) == 0:
+                return
+            cx = (detections[:, 0] + detections[:, 2]) * (0.5 * self.cols / frame_w)
+            cy = (detections[:, 1] + detections[:, 3]) * (0.5 * self.rows / frame_h)
+            gx = np.clip(cx.astype(np.int64), 0, self.cols - 1)
+            gy = np.clip(cy.astype(np.int64), 0, self.rows - 1)
+            counts = np.bincount(gy * self.cols + gx, minlength=self.rows * self.cols)
+            self.grid += counts.reshape(self.rows, self.cols).astype(np.float32)
+
+    def snapshot(self, now=None):
+        """Decayed copy of the grid as of `now` (rows x cols, float32)."""
+        with self.lock:
+            factor = self._decay_factor(now) if now is not None else 1.0
+            return self.grid * np.float32(factor)
+
+
+# ─── ZONES & COUNTING LINES ───────────────────────────────────────────────────
+class ZoneCounter:
+    """
+    Per-zone occupancy and per-line crossing counts.
+
+    Zones are polygons rasterised once into a label mask (one bit per zone),
+    so membership is a single array lookup per centroid. Lines count track
+    IDs whose centroid moves from one side of the segment to the other;
+    "forward" is the line direction (first -> second point) turned 90 degrees
+    counter-clockwise on screen, e.g. left-to-right for a line drawn top-down.
+
+    zones.json (coordinates normalized to 0..1 of the frame):
+        {"zones": {"road_fence": [[0.0, 0.7], [1.0, 0.7], [1.0, 1.0], [0.0, 1.0]]},
+         "lines": {"gate": [[0.45, 0.2], [0.45, 0.8]]}}
+    """
+    MAX_ZONES = 32
+
+    def __init__(self, zones, lines, downscale=ZONE_MASK_DOWNSCALE):
+        if len(zones) > self.MAX_ZONES:
+            raise ValueError(f"At most {self.MAX_ZONES} zones are supported")
+        self.zone_names = list(zones)
+        self.zone_polys = [np.asarray(zones[name], dtype=np.float64) for name in self.zone_names]
+        self.line_names = list(lines)
+        self.line_pts = np.asarray([lines[name] for name in self.line_names],
+                                   dtype=np.float64).reshape(-1, 2, 2)
+        self.downscale = max(1, int(downscale))
+
+        self.frame_size = None
+        self.mask = None
+        self.line_px = None
+
+        self.occupancy = {name: 0 for name in self.zone_names}
+        self.crossings = {name: {'forward': 0, 'backward': 0} for name in self.line_names}
+        self.track_state = {}   # track_id -> (last_seen, centroid, side per line)
+        self._last_expiry = 0.0
+
+    @classmethod
+    def from_file(cls, path=ZONES_CFG):
+        """Load zones.json if present; returns None when no zones/lines are configured."""
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            cfg = json.load(f)
+        zones, lines = cfg.get('zones', {}), cfg.get('lines', {})
+        if not zones and not lines:
+            return None
+        return cls(zones, lines)
+
+    def _prepare(self, frame_w, frame_h):
+        """(Re)build the label mask and pixel-space lines for this frame size."""
+        self.frame_size = (frame_w, frame_h)
+        ds = self.downscale
+        mask_w, mask_h = -(-frame_w // ds), -(-frame_h // ds)
+        self.mask = np.zeros((mask_h, mask_w), dtype=np.uint32)
+        layer = np.zeros((mask_h, mask_w), dtype=np.uint8)
+        for bit, poly in enumerate(self.zone_polys):
+            layer[:] = 0
+            pts = np.round(poly * (mask_w, mask_h)).astype(np.int32)
+            cv2.fillPoly(layer, [pts], 1)
+            self.mask |= layer.astype(np.uint32) << np.uint32(bit)
+        self.line_px = self.line_pts * (frame_w, frame_h)
+
+    def update(self, t, detections, frame_w, frame_h):
+        if self.frame_size != (frame_w, frame_h):
+            self._prepare(frame_w, frame_h)
+        cx = (detections[:, 0] + detections[:, 2]) * 0.5
+        cy = (detections[:, 1] + detections[:, 3]) * 0.5
+
+        if self.zone_names:
+            mx = np.clip((cx // self.downscale).astype(np.int64), 0, self.mask.shape[1] - 1)
+            my = np.clip((cy // self.downscale).astype(np.int64), 0, self.mask.shape[0] - 1)
+            labels = self.mask[my, mx]
+            bits = np.arange(len(self.zone_names), dtype=np.uint32)
+            counts = ((labels[:, None] >> bits) & 1).sum(axis=0)
+            self.occupancy = dict(zip(self.zone_names, counts.tolist()))
+
+        if self.line_names:
+            self._update_lines(t, cx, cy, detections[:, 5])
+
+    def _update_lines(self, t, cx, cy, track_ids):
+        a = self.line_px[:, 0]                      # (L, 2)
+        d = self.line_px[:, 1] - a                  # (L, 2)
+        # side of every centroid w.r.t. every line: sign of the 2D cross product
+        sides = np.sign(d[:, 0] * (cy[:, None] - a[:, 1]) - d[:, 1] * (cx[:, None] - a[:, 0]))
+
+        for i, tid in enumerate(track_ids.tolist()):
+            if tid < 0:
+                continue
+            p1 = (cx[i], cy[i])
+            prev = self.track_state.get(tid)
+            if prev is not None:
+                _, p0, prev_sides = prev
+                for j in np.nonzero(prev_sides * sides[i] < 0)[0].tolist():
+                    if self._crosses_segment(p0, p1, self.line_px[j]):
+                        key = 'forward' if prev_sides[j] > 0 else 'backward'
+                        self.crossings[self.line_names[j]][key] += 1
+                # keep the last non-zero side so touching the line does not reset it
+                sides[i] = np.where(sides[i] == 0, prev_sides, sides[i])
+            self.track_state[tid] = (t, p1, sides[i])
+
+        if t - self._last_expiry >= 1.0:
+            cutoff = t - TRACK_RETENTION
+            for tid in [k for k, v in self.track_state.items() if v[0] < cutoff]:
+                del self.track_state[tid]
+            self._last_expiry = t
+
+    @staticmethod
+    def _crosses_segment(p0, p1, line):
+        """True if the movement p0 -> p1 passes between the line's endpoints."""
+        (ax, ay), (bx, by) = line
+        mx, my = p1[0] - p0[0], p1[1] - p0[1]
+        side_a = mx * (ay - p0[1]) - my * (ax - p0[0])
+        side_b = mx * (by - p0[1]) - my * (bx - p0[0])
+        return side_a * side_b <= 0
+
+    def draw(self, frame):
+        """Outline zones and counting lines on the frame."""
+        if self.frame_size is None:
+            return
+        w, h = self.frame_size
+        for name, poly in zip(self.zone_names, self.zone_polys):
+            pts = np.round(poly * (w, h)).astype(np.int32)
+            cv2.polylines(frame, [pts], True, (0, 165, 255), 2)
+            cv2.putText(frame, f"{name}: {self.occupancy[name]}", tuple(pts[0]),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 165, 255), 2)
+        for name, line in zip(self.line_names, self.line_px):
+            (ax, ay), (bx, by) = np.round(line).astype(int).tolist()
+            c = self.crossings[name]
+            cv2.line(frame, (ax, ay), (bx, by), (255, 0, 255), 2)
+            cv2.putText(frame, f"{name}: +{c['forward']} -{c['backward']}", (ax, ay),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 0, 255), 2)
+
+    def stats(self):
+        return {
+            'zones': dict(self.occupancy),
+            'lines': {name: dict(c) for name, c in self.crossings.items()},
+        }
+
+
+# ─── BEHAVIOUR CLASSIFICATION ─────────────────────────────────────────────────
+class _TrackKinematics:
+    """Running kinematics for one track; every update is O(1) amortized."""
+    __slots__ = ('t', 'x', 'y', 'size', 'steps', 'dist_sum', 'dt_sum',
+                 'anchor_x', 'anchor_y', 'anchor_t', 'speed', 'activity')
+
+    def __init__(self, t, x, y, size):
+        self.t, self.x, self.y, self.size = t, x, y, size
+        self.steps = deque()            # (t, distance, dt) inside the window
+        self.dist_sum = 0.0
+        self.dt_sum = 0.0
+        self.anchor_x, self.anchor_y, self.anchor_t = x, y, t
+        self.speed = 0.0
+        self.activity = 'Grazing'
+
+    @property
+    def dwell(self):
+        return self.t - self.anchor_t
+
+
+class BehaviourClassifier:
+    """
+    Classifies each track as Resting / Grazing / Walking from its centroid
+    speed over a sliding time window and its dwell time, both maintained
+    incrementally per detection. Speeds are in body lengths per second
+    (box diagonal), so thresholds hold across zoom levels and altitudes.
+    """
+    ACTIVITIES = ('Resting', 'Grazing', 'Walking')
+
+    def __init__(self, window=BEHAVIOUR_WINDOW):
+        self.window = float(window)
+        self.states = {}
+        self.activity_counts = {name: 0 for name in self.ACTIVITIES}
+        self.lock = threading.Lock()
+        self._last_expiry = 0.0
+
+    def update(self, t, detections):
+        counts = dict.fromkeys(self.ACTIVITIES, 0)
+        with self.lock:
+            for x1, y1, x2, y2, _conf, tid in detections.tolist():
+                if tid < 0:
+                    continue
+                tid = int(tid)
+                x, y = (x1 + x2) * 0.5, (y1 + y2) * 0.5
+                size = max(math.hypot(x2 - x1, y2 - y1), 1.0)
+                st = self.states.get(tid)
+                if st is None:
+                    st = self.states[tid] = _TrackKinematics(t, x, y, size)
+                else:
+                    self._step(st, t, x, y, size)
+                counts[st.activity] += 1
+            self.activity_counts = counts
+            if t - self._last_expiry >= 1.0:
+                cutoff = t - TRACK_RETENTION
+                for tid in [k for k, st in self.states.items() if st.t < cutoff]:
+                    del self.states[tid]
+                self._last_expiry = t
+
+    def _step(self, st, t, x, y, size):
+        dt = t - st.t
+        if dt <= 0:
+            return
+        # Smooth the body size so box jitter does not dominate the speed
+        st.size += 0.1 * (size - st.size)
+        dist = math.hypot(x - st.x, y - st.y) / st.size
+        st.steps.append((t, dist, dt))
+        st.dist_sum += dist
+        st.dt_sum += dt
+        while st.steps and st.steps[0][0] < t - self.window:
+            _, old_dist, old_dt = st.steps.popleft()
+            st.dist_sum -= old_dist
+            st.dt_sum -= old_dt
+        st.t, st.x, st.y = t, x, y
+
+        if math.hypot(x - st.anchor_x, y - st.anchor_y) / st.size > BEHAVIOUR_DWELL_RADIUS:
+            st.anchor_x, st.anchor_y, st.anchor_t = x, y, t
+
+        st.speed = st.dist_sum / st.dt_sum if st.dt_sum > 0 else 0.0
+        if st.speed < BEHAVIOUR_REST_SPEED and st.dwell >= BEHAVIOUR_REST_DWELL:
+            st.activity = 'Resting'
+        elif st.speed < BEHAVIOUR_WALK_SPEED:
+            st.activity = 'Grazing'
+        else:
+            st.activity = 'Walking'
+
+    def track_state(self, track_id):
+        with self.lock:
+            st = self.states.get(track_id)
+            if st is None:
+                return None
+            return {
+                'activity': st.activity,
+                'speed': round(st.speed, 3),
+                'dwell': round(st.dwell, 1),
+            }
+
+
+# ─── ALERT ENGINE ─────────────────────────────────────────────────────────────
+class AlertRule:
+    """
+    One debounced, hysteretic rule. An inactive rule fires once its trigger
+    condition has held for `debounce` seconds; an active rule clears once its
+    clear condition has held for `clear_debounce` seconds.
+
+    Rule types (alerts.json "rules" entries):
+        {"name": "large_herd", "type": "threshold", "above": 20, "clear_below": 15, "debounce": 3}
+        {"name": "fence", "type": "zone", "zone": "road_fence", "min_count": 1, "debounce": 2}
+        {"name": "herd_gone", "type": "absence", "after": 300}
+    """
+    TYPES = ('threshold', 'zone', 'absence')
+
+    def __init__(self, cfg):
+        self.name = cfg['name']
+        self.type = cfg.get('type', 'threshold')
+        if self.type not in self.TYPES:
+            raise ValueError(f"Alert rule {self.name!r}: unknown type {self.type!r}")
+        self.zone = cfg.get('zone')
+        if self.type == 'zone' and not self.zone:
+            raise ValueError(f"Alert rule {self.name!r}: zone rules need a 'zone'")
+
+        if self.type == 'absence':
+            self.above = None
+            self.clear_below = None
+            self.debounce = float(cfg.get('after', 60.0))
+        else:
+            key = 'min_count' if self.type == 'zone' else 'above'
+            self.above = float(cfg.get(key, 1))
+            self.clear_below = float(cfg.get('clear_below', self.above - 1))
+            self.debounce = float(cfg.get('debounce', 0.0))
+        self.clear_debounce = float(cfg.get('clear_debounce', cfg.get('debounce', 0.0)))
+
+        self.active = False
+        self.pending_since = None   # when the condition for the next transition started
+
+    def value(self, summary):
+        if self.type == 'zone':
+            return summary.get('zones', {}).get(self.zone, 0)
+        return summary['bison_count']
+
+    def _triggered(self, v):
+        return v == 0 if self.type == 'absence' else v >= self.above
+
+    def _cleared(self, v):
+        return v > 0 if self.type == 'absence' else v <= self.clear_below
+
+    def evaluate(self, t, summary):
+        """Return 'fired', 'cleared' or None for this frame summary."""
+        v = self.value(summary)
+        condition = self._cleared(v) if self.active else self._triggered(v)
+        if not condition:
+            self.pending_since = None
+            return None
+        if self.pending_since is None:
+            self.pending_since = t
+        hold = self.clear_debounce if self.active else self.debounce
+        if t - self.pending_since < hold:
+            return None
+        self.active = not self.active
+        self.pending_since = None
+        return 'fired' if self.active else 'cleared'
+
+
+class AlertEngine:
+    """
+    Evaluates alert rules on per-frame summaries in a background thread and
+    delivers state changes to an optional webhook and a bounded history.
+    """
+    def __init__(self, rules, webhook_url=None, history=ALERT_HISTORY):
+        self.rules = rules
+        self.webhook_url = webhook_url
+        self.history = deque(maxlen=history)
+        self.next_id = 1
+        self.lock = threading.Lock()
+        self.eval_q = queue.Queue(maxsize=256)
+        self.webhook_q = queue.Queue(maxsize=256)
+        self.listeners = []          # callables invoked with each alert event
+        self.running = False
+        self.frames_dropped = 0
+
+    @classmethod
+    def from_file(cls, path=ALERTS_CFG):
+        """Load alerts.json if present; returns None when no rules are configured."""
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            cfg = json.load(f)
+        rules = [AlertRule(rule) for rule in cfg.get('rules', [])]
+        if not rules:
+            return None
+        return cls(rules, webhook_url=cfg.get('webhook'))
+
+    def start(self):
+        self.running = True
+        threading.Thread(target=self._eval_loop, daemon=True).start()
+        if self.webhook_url:
+            threading.Thread(target=self._webhook_loop, daemon=True).start()
+
+    def submit(self, t, summary):
+        """Queue a frame summary ({'bison_count': n, 'zones': {...}}); never blocks."""
+        try:
+            self.eval_q.put_nowait((t, summary))
+        except queue.Full:
+            self.frames_dropped += 1
+
+    def _eval_loop(self):
+        while self.running:
+            try:
+                t, summary = self.eval_q.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            for rule in self.rules:
+                state = rule.evaluate(t, summary)
+                if state:
+                    self._emit(rule, state, t, rule.value(summary))
+
+    def _emit(self, rule, state, t, value):
+        with self.lock:
+            event = {
+                'id': self.next_id,
+                'rule': rule.name,
+                'type': rule.type,
+                'state': state,
+                't': round(t, 3),
+                'time': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(t)),
+                'value': value,
+            }
+            if rule.zone:
+                event['zone'] = rule.zone
+            self.next_id += 1
+            self.history.append(event)
+        print(f"ALERT {state}: {rule.name} (value={value})")
+        for listener in self.listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                print(f"Alert listener error: {e}")
+        if self.webhook_url:
+            try:
+                self.webhook_q.put_nowait(event)
+            except queue.Full:
+                print(f"Alert webhook queue full, dropping alert {event['id']}")
+
+    def _webhook_loop(self):
+        while self.running:
+            try:
+                event = self.webhook_q.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            req = urllib.request.Request(
+                self.webhook_url, data=json.dumps(event).encode('utf-8'),
+                headers={'Content-Type': 'application/json'}, method='POST')
+            try:
+                with urllib.request.urlopen(req, timeout=ALERT_WEBHOOK_TIMEOUT) as resp:
+                    resp.read()
+            except Exception as e:
+                print(f"Alert webhook error: {e}")
+
+    def active_rules(self):
+        return [rule.name for rule in self.rules if rule.active]
+
+    def events_since(self, last_id=0):
+        with self.lock:
+            return [event for event in self.history if event['id'] > last_id]
+
+    def stop(self):
+        self.running = False
+
+
+# ─── EVENT CLIPS ──────────────────────────────────────────────────────────────
+class ClipRecorder:
+    """
+    Saves an MP4 clip around each fired alert from the HLS segment window.
+    Pre-roll segments are hard-linked the moment the alert fires (before
+    ffmpeg rotates them out), post-roll segments are collected as they
+    finish, and the clip is assembled by stream copy (no re-encoding).
+    """
+    INDEX_NAME = "index.json"
+
+    def __init__(self, hls, clips_dir=CLIPS_DIR, pre_roll=CLIP_PRE_ROLL, post_roll=CLIP_POST_ROLL):
+        self.hls = hls
+        self.clips_dir = os.path.abspath(clips_dir)
+        self.pre_roll = float(pre_roll)
+        self.post_roll = float(post_roll)
+        self.lock = threading.Lock()
+        os.makedirs(self.clips_dir, exist_ok=True)
+        self.index = self._load_index()
+
+    def _load_index(self):
+        path = os.path.join(self.clips_dir, self.INDEX_NAME)
+        if not os.path.exists(path):
+            return []
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return []
+
+    def _save_index(self):
+        path = os.path.join(self.clips_dir, self.INDEX_NAME)
+        tmp = path + ".tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.index, f, indent=2)
+        os.replace(tmp, path)
+
+    def on_alert(self, event):
+        """AlertEngine listener: grab the pre-roll now, finish the clip in the background."""
+        if event['state'] != 'fired' or not self.hls.tmpdir:
+            return
+        staging = tempfile.mkdtemp(prefix=f"clip{event['id']}_", dir=self.hls.tmpdir)
+        taken = []
+        total = 0.0
+        for path, duration in reversed(self.hls.finished_segments()):
+            if total >= self.pre_roll:
+                break
+            staged = self._stage(path, staging)
+            if staged:
+                taken.append(staged)
+                total += duration
+        taken.reverse()
+        last = os.path.basename(taken[-1]) if taken else None
+        threading.Thread(target=self._finish_clip, args=(event, staging, taken, last),
+                         daemon=True).start()
+
+    @staticmethod
+    def _stage(path, staging):
+        target = os.path.join(staging, os.path.basename(path))
+        try:
+            os.link(path, target)     # same filesystem: instant, survives deletion
+        except OSError:
+            try:
+                shutil.copy2(path, target)
+            except OSError:
+                return None
+        return target
+
+    def _finish_clip(self, event, staging, segments, last_name):
+        try:
+            post = 0.0
+            deadline = time.time() + self.post_roll + 4 * self.hls.segment_time
+            while post < self.post_roll and time.time() < deadline and self.hls.tmpdir:
+                time.sleep(self.hls.segment_time / 2.0)
+                current = self.hls.finished_segments()
+                names = [os.path.basename(p) for p, _ in current]
+                start = names.index(last_name) + 1 if last_name in names else 0
+                for path, duration in current[start:]:
+                    staged = self._stage(path, staging)
+                    if staged:
+                        segments.append(staged)
+                        post += duration
+                    last_name = os.path.basename(path)
+            if segments:
+                self._write_clip(event, segments)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def _write_clip(self, event, segments):
+        stamp = time.strftime('%Y%m%d_%H%M%S', time.localtime(event['t']))
+        rule = "".join(c if c.isalnum() else "_" for c in event['rule'])
+        name = f"clip_{stamp}_{event['id']}_{rule}.mp4"
+        out = os.path.join(self.clips_dir, name)
+        cmd = [
+            "ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+            "-i", "concat:" + "|".join(segments),
+            "-c", "copy",
+            "-movflags", "+faststart",
+            out,
+        ]
+        result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        if result.returncode != 0 or not os.path.exists(out):
+            print(f"Clip for alert {event['id']} failed: {result.stderr.decode(errors='ignore').strip()}")
+            return
+        entry = {
+            'file': name,
+            'event_id': event['id'],
+            'rule': event['rule'],
+            't': event['t'],
+            'time': event['time'],
+            'segments': len(segments),
+            'size': os.path.getsize(out),
+        }
+        with self.lock:
+            self.index.append(entry)
+            self._save_index()
+        print(f"Saved clip: {out}")
+
+    def list_clips(self):
+        with self.lock:
+            return list(self.index)
+
+    def resolve_clip(self, name):
+        """Path of an indexed clip, or None (only indexed files are served)."""
+        with self.lock:
+            if not any(entry['file'] == name for entry in self.index):
+                return None
+        path = os.path.join(self.clips_dir, name)
+        return path if os.path.exists(path) else None
+
+
+# ─── CONFIDENCE STATISTICS ────────────────────────────────────────────────────
+class ConfidenceStats:
+    """
+    Streaming detection-confidence statistics in constant memory:
+      - lifetime mean / std (Welford, merged per frame with Chan's formula)
+      - sliding window of the last `window` detections (running sums over a ring)
+      - p5 / p50 / p95 for both, from fixed-bin histograms over [0, 1]
+    """
+    QUANTILES = (('p5', 0.05), ('p50', 0.50), ('p95', 0.95))
+
+    def __init__(self, window=CONF_WINDOW, bins=CONF_HIST_BINS):
+        self.bins = int(bins)
+        self.lock = threading.Lock()
+        # lifetime
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.hist = np.zeros(self.bins, dtype=np.int64)
+        # sliding window
+        self.ring = np.zeros(int(window), dtype=np.float64)
+        self.pos = 0
+        self.win_n = 0
+        self.win_sum = 0.0
+        self.win_sumsq = 0.0
+        self.win_hist = np.zeros(self.bins, dtype=np.int64)
+
+    def _bin_counts(self, values):
+        idx = np.clip((values * self.bins).astype(np.int64), 0, self.bins - 1)
+        return np.bincount(idx, minlength=self.bins)
+
+    def update(self, confidences):
+        values = np.asarray(confidences, dtype=np.float64)
+        if values.size == 0:
+            return
+        with self.lock:
+            # lifetime: merge this frame's batch into the running moments
+            k = values.size
+            batch_mean = float(values.mean())
+            delta = batch_mean - self.mean
+            total = self.n + k
+            self.mean += delta * k / total
+            self.m2 += float(((values - batch_mean) ** 2).sum()) + delta * delta * self.n * k / total
+            self.n = total
+            self.hist += self._bin_counts(values)
+            self._push_window(values)
+
+    def _push_window(self, values):
+        size = len(self.ring)
+        values = values[-size:]
+        idx = (self.pos + np.arange(values.size)) % size
+        old = self.ring[idx[idx < self.win_n]]
+        if old.size:
+            self.win_sum -= float(old.sum())
+            self.win_sumsq -= float((old * old).sum())
+            self.win_hist -= self._bin_counts(old)
+        self.ring[idx] = values
+        self.win_sum += float(values.sum())
+        self.win_sumsq += float((values * values).sum())
+        self.win_hist += self._bin_counts(values)
+        self.win_n = min(self.win_n + values.size, size)
+        new_pos = (self.pos + values.size) % size
+        if new_pos < self.pos or values.size == size:
+            # wrapped: resync the running sums to shed accumulated rounding error
+            valid = self.ring[:self.win_n]
+            self.win_sum = float(valid.sum())
+            self.win_sumsq = float((valid * valid).sum())
+        self.pos = new_pos
+
+    def window_mean(self):
+        with self.lock:
+            return self.win_sum / self.win_n if self.win_n else 0.0
+
+    def _quantiles(self, hist, n):
+        if n == 0:
+            return {name: None for name, _ in self.QUANTILES}
+        cum = np.cumsum(hist)
+        out = {}
+        for name, q in self.QUANTILES:
+            i = int(np.searchsorted(cum, q * n))
+            out[name] = round((min(i, self.bins - 1) + 0.5) / self.bins, 4)
+        return out
+
+    def summary(self):
+        with self.lock:
+            lifetime = {
+                'n': self.n,
+                'mean': round(self.mean, 4),
+                'std': round(math.sqrt(self.m2 / self.n), 4) if self.n else 0.0,
+            }
+            lifetime.update(self._quantiles(self.hist, self.n))
+            if self.win_n:
+                win_mean = self.win_sum / self.win_n
+                win_var = max(self.win_sumsq / self.win_n - win_mean * win_mean, 0.0)
+            else:
+                win_mean = win_var = 0.0
+            window = {
+                'n': self.win_n,
+                'mean': round(win_mean, 4),
+                'std': round(math.sqrt(win_var), 4),
+            }
+            window.update(self._quantiles(self.win_hist, self.win_n))
+            return {'lifetime': lifetime, 'window': window}
+
+
+# ─── DISTINCT ANIMAL COUNTS ───────────────────────────────────────────────────
+class DistinctTrackCounter:
+    """
+    Number of distinct track IDs seen in each rolling window. Every window
+    keeps an OrderedDict of ID -> last seen ordered by recency, so expiry pops
+    from the front and a count is just len(); memory is bounded by the IDs
+    seen within the window (capped at DISTINCT_MAX_IDS).
+    """
+    def __init__(self, windows=None, max_ids=DISTINCT_MAX_IDS):
+        self.windows = dict(windows or DISTINCT_WINDOWS)
+        self.max_ids = int(max_ids)
+        self.seen = {name: OrderedDict() for name in self.windows}
+        self.longest = max(self.windows, key=self.windows.get)
+        self.total = 0
+        self.lock = threading.Lock()
+
+    def update(self, t, track_ids):
+        with self.lock:
+            for tid in track_ids:
+                tid = int(tid)
+                if tid < 0:
+                    continue
+                if tid not in self.seen[self.longest]:
+                    self.total += 1
+                for ids in self.seen.values():
+                    ids[tid] = t
+                    ids.move_to_end(tid)
+            for name, ids in self.seen.items():
+                cutoff = t - self.windows[name]
+                while ids and (len(ids) > self.max_ids or next(iter(ids.values())) < cutoff):
+                    ids.popitem(last=False)
+
+    def counts(self):
+        with self.lock:
+            out = {name: len(ids) for name, ids in self.seen.items()}
+            out['total'] = self.total
+            return out
+
+
 # ─── STREAM MANAGER ───────────────────────────────────────────────────────────
 class StreamManager:
     def __init__(self, rtsp_url, apply_model=False):
@@ -228,14 +1494,42 @@ class StreamManager:
         self.model = None
         self.cap = None
         self.hls = None
+        self.clips = None
         self.stream_thread = None
 
+        self.history = TimeSeriesStore()
+        self.detection_log = None
+        self.tracks = TrackStore()
+        self.heatmap = HeatmapAccumulator()
+        self.behaviour = BehaviourClassifier()
+        self.confidence = ConfidenceStats()
+        self.distinct = DistinctTrackCounter()
+        try:
+            self.zones = ZoneCounter.from_file(ZONES_CFG)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring {ZONES_CFG}: {e}")
+            self.zones = None
+        try:
+            self.alerts = AlertEngine.from_file(ALERTS_CFG)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Ignoring {ALERTS_CFG}: {e}")
+            self.alerts = None
+        # per-frame detection summary consumed by the stream loop
+        self.frame_bison_count = 0
+        self.frame_conf_sum = 0.0
+        self.frame_conf_n = 0
+        self.frame_detections = NO_DETECTIONS
+
         self.stats = {
             'total_frames': 0,
+            'bison_count': 0,
             'total_detections': 0,
             'max_bison_in_frame': 0,
             'avg_confidence': 0.0,
-            'fps': 0.0
+            'fps': 0.0,
+            'activity_counts': dict(self.behaviour.activity_counts),
+            'hls_frames_duplicated': 0,
+            'hls_frames_dropped': 0
         }
 
         if apply_model and YOLO_AVAILABLE:
@@ -266,9 +1560,24 @@ class StreamManager:
         print(f"  Resolution: {width}x{height}")
         print(f"  FPS: {fps:.1f}")
 
+        if self.apply_model:
+            self.detection_log = DetectionLog()
+            try:
+                self.detection_log.start(source=self.rtsp_url)
+            except sqlite3.Error as e:
+                print(f"Detection log disabled: {e}")
+                self.detection_log = None
+
         # Start HLS manager (if ffmpeg available)
         self.hls = HLSManager(width, height, fps, HLS_SEGMENT_TIME, HLS_LIST_SIZE, HLS_DELETE_OLD)
         hls_ok = self.hls.start()
+        if self.alerts:
+            if hls_ok:
+                self.clips = ClipRecorder(self.hls)
+                self.alerts.listeners.append(self.clips.on_alert)
+            else:
+                print("Alert clips disabled: they are cut from the HLS segments.")
+            self.alerts.start()
 
         self.running = True
         self.stream_thread = threading.Thread(target=self._stream_loop, daemon=True)
@@ -295,6 +1604,10 @@ class StreamManager:
 
             # FPS calc
             now = time.time()
+            self.frame_bison_count = 0
+            self.frame_conf_sum = 0.0
+            self.frame_conf_n = 0
+            self.frame_detections = NO_DETECTIONS
             if now - last_fps_time >= 1.0:
                 self.stats['fps'] = fps_frame_count / (now - last_fps_time)
                 fps_frame_count = 0
@@ -305,6 +1618,7 @@ class StreamManager:
                 frame = self._process_frame_with_model(frame, frame_count)
             else:
                 self._add_basic_overlay(frame, frame_count)
+            self._update_analytics(now, frame_count, frame)
 
             # Make a copy for MJPEG
             with self.frame_lock:
@@ -312,15 +1626,43 @@ class StreamManager:
 
             # Push to HLS if active
             if self.hls and self.hls.enabled:
-                # Important: HLS expects contiguous frames at roughly constant size/rate
-                # We queue the current BGR frame
+                # HLS expects contiguous frames at a constant rate; the HLS
+                # writer thread paces them, we just queue the current BGR frame
                 self.hls.write_frame(frame)
+                self.stats['hls_frames_duplicated'] = self.hls.frames_duplicated
+                self.stats['hls_frames_dropped'] = self.hls.frames_dropped
 
             self.stats['total_frames'] = frame_count
+            self.stats['bison_count'] = self.frame_bison_count
+            self.history.record(now, self.frame_bison_count,
+                                self.frame_conf_sum, self.frame_conf_n,
+                                self.stats['fps'], time.time() - now)
 
             # Small chill to avoid tight loop
             time.sleep(0.001)
 
+    def _update_analytics(self, now, frame_count, frame):
+        """Feed this frame's detections (self.frame_detections) to the analytics stores."""
+        detections = self.frame_detections
+        frame_h, frame_w = frame.shape[:2]
+        if self.detection_log:
+            self.detection_log.record(now, frame_count, detections)
+        self.tracks.update(now, detections)
+        self.heatmap.update(now, detections, frame_w, frame_h)
+        self.behaviour.update(now, detections)
+        self.distinct.update(now, detections[:, 5].tolist())
+        self.stats['activity_counts'] = self.behaviour.activity_counts
+        if self.zones:
+            self.zones.update(now, detections, frame_w, frame_h)
+            self.zones.draw(frame)
+            self.stats.update(self.zones.stats())
+        if self.alerts:
+            self.alerts.submit(now, {
+                'bison_count': self.frame_bison_count,
+                'zones': self.stats.get('zones', {}),
+            })
+            self.stats['active_alerts'] = self.alerts.active_rules()
+
     def _process_frame_with_model(self, frame, frame_count):
         try:
             results = self.model.track(
@@ -334,6 +1676,7 @@ class StreamManager:
             boxes = results.boxes
             bison_count = 0
             frame_confidences = []
+            detections = []
 
             if boxes is not None:
                 coords = boxes.xyxy.tolist()
@@ -348,6 +1691,7 @@ class StreamManager:
                         continue
                     bison_count += 1
                     frame_confidences.append(conf)
+                    detections.append((x1, y1, x2, y2, conf, tid if tid is not None else -1))
                     x1, y1, x2, y2 = map(int, (x1, y1, x2, y2))
 
                     color_intensity = int(255 * max(0.0, min(1.0, float(conf))))
@@ -361,10 +1705,17 @@ class StreamManager:
                     cv2.putText(frame, label, (x1, y1 - 5),
                                 cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 2)
 
+            self.frame_bison_count = bison_count
+            self.frame_conf_sum = float(sum(frame_confidences))
+            self.frame_conf_n = len(frame_confidences)
+            if detections:
+                self.frame_detections = np.array(detections, dtype=np.float64)
             self.stats['total_detections'] += bison_count
             self.stats['max_bison_in_frame'] = max(self.stats['max_bison_in_frame'], bison_count)
             if frame_confidences:
-                self.stats['avg_confidence'] = sum(frame_confidences) / len(frame_confidences)
+                # smoothed over the sliding window rather than the last frame
+                self.confidence.update(frame_confidences)
+                self.stats['avg_confidence'] = self.confidence.window_mean()
 
             self._add_detection_overlay(frame, bison_count, frame_count)
         except Exception as e:
@@ -395,6 +1746,26 @@ class StreamManager:
         cv2.putText(frame, f"Frame: {frame_count}",
                     (w - 140, 65), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
 
+    def snapshot_stats(self):
+        """Copy of the live stats plus summaries that are computed on demand."""
+        stats = self.stats.copy()
+        stats['confidence'] = self.confidence.summary()
+        stats['distinct_bison'] = self.distinct.counts()
+        return stats
+
+    def track_summaries(self):
+        """Live tracks from the trajectory store, annotated with their activity."""
+        summaries = self.tracks.list_tracks()
+        for summary in summaries:
+            summary.update(self.behaviour.track_state(summary['id']) or {})
+        return summaries
+
+    def track_detail(self, track_id):
+        detail = self.tracks.get(track_id)
+        if detail is not None:
+            detail.update(self.behaviour.track_state(track_id) or {})
+        return detail
+
     def get_current_frame(self):
         with self.frame_lock:
             return self.current_frame.copy() if self.current_frame is not None else None
@@ -411,10 +1782,18 @@ class StreamManager:
                 self.hls.stop()
             except Exception:
                 pass
+        if self.detection_log:
+            self.detection_log.stop()
+        if self.alerts:
+            self.alerts.stop()
 
 
 # ─── HTTP HANDLER ─────────────────────────────────────────────────────────────
 class StreamingHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 keeps pollers' connections open between requests, so every
+    # response must carry a Content-Length (or close the connection)
+    protocol_version = "HTTP/1.1"
+
     def __init__(self, stream_manager: StreamManager, *args, **kwargs):
         self.stream_manager = stream_manager
         super().__init__(*args, **kwargs)
@@ -441,6 +1820,23 @@ class StreamingHandler(BaseHTTPRequestHandler):
             return self.serve_mjpeg_stream()
         elif parsed.path == '/stats':
             return self.serve_stats()
+        elif parsed.path == '/history':
+            return self.serve_history(parse_qs(parsed.query))
+        elif parsed.path == '/detections':
+            return self.serve_detections(parse_qs(parsed.query))
+        elif parsed.path == '/heatmap':
+            return self.serve_heatmap(parse_qs(parsed.query))
+        elif parsed.path == '/alerts':
+            return self.serve_alerts(parse_qs(parsed.query))
+        elif parsed.path == '/clips':
+            clips = self.stream_manager.clips
+            return self._send_json({'clips': clips.list_clips() if clips else []})
+        elif parsed.path.startswith('/clips/'):
+            return self.serve_clip(parsed.path[len('/clips/'):].strip('/'))
+        elif parsed.path == '/tracks':
+            return self._send_json({'tracks': self.stream_manager.track_summaries()})
+        elif parsed.path.startswith('/tracks/'):
+            return self.serve_track(parsed.path[len('/tracks/'):].strip('/'))
         elif parsed.path == '/hls.m3u8':
             return self.serve_hls_playlist()
         elif parsed.path.startswith('/hls/'):
@@ -460,6 +1856,8 @@ class StreamingHandler(BaseHTTPRequestHandler):
         self.wfile.write(data)
 
     def serve_mjpeg_stream(self):
+        # Unbounded multipart body: the connection ends with the stream
+        self.close_connection = True
         self.send_response(200)
         self.send_header('Content-Type', 'multipart/x-mixed-replace; boundary=frame')
         self.send_header('Cache-Control', 'no-cache')
@@ -485,35 +1883,154 @@ class StreamingHandler(BaseHTTPRequestHandler):
         except Exception as e:
             print(f"MJPEG streaming error: {e}")
 
-    def serve_stats(self):
-        stats = self.stream_manager.stats.copy()
-        stats_json = json.dumps(stats, indent=2).encode("utf-8")
+    def _send_json(self, payload, indent=None):
+        data = json.dumps(payload, indent=indent).encode("utf-8")
         self.send_response(200)
         self.send_header('Content-Type', 'application/json; charset=utf-8')
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Cache-Control', 'no-store')
-        self.send_header('Content-Length', str(len(stats_json)))
+        self.send_header('Content-Length', str(len(data)))
         self.end_headers()
-        self.wfile.write(stats_json)
+        self.wfile.write(data)
+
+    def _send_bytes(self, data, content_type, headers=None):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Cache-Control', 'no-store')
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def serve_stats(self):
+        self._send_json(self.stream_manager.snapshot_stats(), indent=2)
+
+    def serve_history(self, query):
+        """
+        /history?from=<epoch s>&to=<epoch s>&res=raw|1s|1m|1h|auto[&points=N&y=count]
+        Returns columnar arrays: t, count, count_max, confidence, fps, latency, ...
+        With points=N the rows are downsampled to at most N by LTTB on column y
+        (cached); res=auto picks the finest rollup that still covers "from".
+        """
+        history = self.stream_manager.history
+        try:
+            t_to = float(query.get('to', [time.time()])[0])
+            t_from = float(query.get('from', [t_to - HISTORY_DEFAULT_SPAN])[0])
+            res = history.resolve(query.get('res', ['1s'])[0], t_from)
+            payload = {'res': res, 'from': t_from, 'to': t_to}
+            if 'points' in query:
+                columns, payload['source_points'] = history.query_downsampled(
+                    t_from, t_to, res, int(query['points'][0]), query.get('y', ['count'])[0])
+            else:
+                columns = history.query(t_from, t_to, res)
+        except ValueError as e:
+            self.send_error(400, str(e))
+            return
+        payload.update(TimeSeriesStore.to_json(columns))
+        self._send_json(payload)
+
+    def serve_detections(self, query):
+        """/detections?from=<epoch s>&to=<epoch s>&limit=N from the durable log."""
+        log = self.stream_manager.detection_log
+        if not log:
+            self.send_error(404, "Detection log not enabled (model processing is off)")
+            return
+        try:
+            t_to = float(query.get('to', [time.time()])[0])
+            t_from = float(query.get('from', [t_to - HISTORY_DEFAULT_SPAN])[0])
+            limit = int(query.get('limit', [DETECTION_QUERY_LIMIT])[0])
+        except ValueError as e:
+            self.send_error(400, str(e))
+            return
+        rows = log.query(t_from, t_to, min(limit, DETECTION_QUERY_LIMIT))
+        columns = ('t', 'frame', 'track_id', 'x1', 'y1', 'x2', 'y2', 'conf')
+        payload = {'from': t_from, 'to': t_to}
+        payload.update({name: [r[i] for r in rows] for i, name in enumerate(columns)})
+        self._send_json(payload)
+
+    def serve_heatmap(self, query):
+        """
+        /heatmap            -> JSON {cols, rows, half_life, max, grid: [[...], ...]}
+        /heatmap?format=bin -> raw little-endian float32 grid (row-major), with
+                               the shape in X-Grid-Cols / X-Grid-Rows headers
+        """
+        heatmap = self.stream_manager.heatmap
+        grid = heatmap.snapshot(time.time())
+        if query.get('format', ['json'])[0] == 'bin':
+            self._send_bytes(grid.astype('<f4').tobytes(), 'application/octet-stream', {
+                'X-Grid-Cols': str(heatmap.cols),
+                'X-Grid-Rows': str(heatmap.rows),
+            })
+            return
+        self._send_json({
+            'cols': heatmap.cols,
+            'rows': heatmap.rows,
+            'half_life': heatmap.half_life,
+            'max': round(float(grid.max()), 4),
+            'grid': np.round(grid, 4).tolist(),
+        })
+
+    def serve_alerts(self, query):
+        """/alerts?since=<id>: alert history (bounded), newest last."""
+        alerts = self.stream_manager.alerts
+        try:
+            since = int(query.get('since', [0])[0])
+        except ValueError as e:
+            self.send_error(400, str(e))
+            return
+        self._send_json({
+            'enabled': alerts is not None,
+            'active': alerts.active_rules() if alerts else [],
+            'alerts': alerts.events_since(since) if alerts else [],
+        })
+
+    def serve_clip(self, name):
+        clips = self.stream_manager.clips
+        path = clips.resolve_clip(name) if clips else None
+        if not path:
+            self.send_error(404)
+            return
+        with open(path, 'rb') as f:
+            data = f.read()
+        self._send_bytes(data, 'video/mp4', {
+            'Content-Disposition': f'attachment; filename="{name}"',
+        })
+
+    def serve_track(self, track_id):
+        """/tracks/<id>: full (possibly compacted) centroid path of one track."""
+        try:
+            payload = self.stream_manager.track_detail(int(track_id))
+        except ValueError:
+            payload = None
+        if payload is None:
+            self.send_error(404, "Unknown track ID")
+            return
+        self._send_json(payload)
 
     def serve_hls_playlist(self):
         """Serve the HLS master playlist path if available, else 503."""
         hls = self.stream_manager.hls
         if not hls or not hls.enabled:
+            body = b"HLS not available (ffmpeg not found or failed to start)."
             self.send_response(503)
             self.send_header('Content-Type', 'text/plain; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
             self.end_headers()
-            self.wfile.write(b"HLS not available (ffmpeg not found or failed to start).")
+            self.wfile.write(body)
             return
 
         playlist = hls.get_playlist_path()
         if not playlist or not os.path.exists(playlist):
             # Playlist not ready yet
+            body = b"Playlist not ready. Try again shortly."
             self.send_response(202)  # Accepted, not ready
             self.send_header('Retry-After', '1')
             self.send_header('Content-Type', 'text/plain; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
             self.end_headers()
-            self.wfile.write(b"Playlist not ready. Try again shortly.")
+            self.wfile.write(body)
             return
 
         with open(playlist, 'rb') as f:
@@ -790,7 +2307,9 @@ def main():
             print("⚠️  HLS disabled (ffmpeg not found or failed to start)")
 
         handler = create_handler(stream_manager)
-        server = HTTPServer(('localhost', HTTP_PORT), handler)
+        # One thread per connection: MJPEG viewers and keep-alive pollers
+        # hold their connections open
+        server = ThreadingHTTPServer(('localhost', HTTP_PORT), handler)
 
         print(f"\nStarting web server on port {HTTP_PORT}")
         server_thread = threading.Thread(target=server.serve_forever, daemon=True)
@@ -801,7 +2320,13 @@ def main():
         print(f"  Main page:   {url}")
         print(f"  MJPEG:       {url}/mjpeg")
         print(f"  HLS:         {url}/hls.m3u8  (segments under /hls/...)")
-        print(f"  Statistics:  {url}/stats\n")
+        print(f"  Statistics:  {url}/stats")
+        print(f"  History:     {url}/history?from=&to=&res=1s  (&points=N to downsample)")
+        print(f"  Detections:  {url}/detections?from=&to=")
+        print(f"  Tracks:      {url}/tracks  (paths under /tracks/<id>)")
+        print(f"  Heatmap:     {url}/heatmap  (?format=bin for raw float32)")
+        print(f"  Alerts:      {url}/alerts?since=<id>")
+        print(f"  Clips:       {url}/clips  (downloads under /clips/<file>)\n")
 
         try:
             webbrowser.open(url)
@@ -0,0 +1,129 @@
+import os
+import sqlite3
+
+import cv2
+import numpy as np
+import pytest
+
+pytest.importorskip("ultralytics.trackers.byte_tracker")
+
+import track
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FRAMES = 40
+
+
+class _Boxes:
+    def __init__(self, rows):
+        self.xyxy = rows[:, :4]
+        self.conf = rows[:, 4]
+        self.cls = rows[:, 5]
+
+    def __len__(self):
+        return len(self.conf)
+
+
+class StubModel:
+    """Two bison walking `dx` px per frame from x0, one above the other."""
+    def __init__(self, x0=20.0, dx=3.0):
+        self.x0, self.dx = x0, dx
+        self.frame = 0
+
+    def predict(self, source, conf, verbose=False):
+        x = self.x0 + self.dx * self.frame
+        self.frame += 1
+        rows = np.array([[x, 20, x + 40, 60, 0.9, 0],
+                         [x, 100, x + 40, 140, 0.8, 0]], dtype=np.float32)
+        return [type("Result", (), {"boxes": _Boxes(rows)})()]
+
+
+@pytest.fixture
+def video(tmp_path):
+    path = str(tmp_path / "clip.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 10, (320, 180))
+    for idx in range(FRAMES):
+        frame = np.zeros((180, 320, 3), dtype=np.uint8)
+        frame[:16, :16] = 5 * idx   # frame index for FrameIndexModel
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+class FrameIndexModel:
+    """Bison A from the first frame, bison B from frame `b_from`; reads the frame index from the pixels."""
+    def __init__(self, b_from, crash_at=None):
+        self.b_from, self.crash_at = b_from, crash_at
+
+    def predict(self, source, conf, verbose=False):
+        idx = int(round(source[:16, :16].mean() / 5))
+        if idx == self.crash_at:
+            raise RuntimeError("simulated crash")
+        rows = [[20 + 2 * idx, 20, 60 + 2 * idx, 60, 0.9, 0]]
+        if idx >= self.b_from:
+            rows.append([200, 100, 240, 140, 0.9, 0])
+        return [type("Result", (), {"boxes": _Boxes(np.array(rows, dtype=np.float32))})()]
+
+
+def _ids(frames):
+    return [sorted(int(tid) for tid in f[:, 5]) for f in frames]
+
+
+def test_chunk_ids_stable_and_reset_per_chunk(video, monkeypatch):
+    monkeypatch.chdir(REPO)   # TRACKER_CFG is relative to the repo root
+    monkeypatch.setattr(track, "_worker_model", StubModel())
+
+    start, frames = track._track_chunk((video, 0, 20))
+    assert start == 0 and len(frames) == 20
+    ids = _ids(frames)
+    assert len(ids[0]) == 2
+    assert all(frame_ids == ids[0] for frame_ids in ids)
+
+    # Next chunk, animals elsewhere: a tracker carried over would hand out new IDs
+    monkeypatch.setattr(track, "_worker_model", StubModel(x0=240.0, dx=-3.0))
+    _, frames = track._track_chunk((video, 20, None))
+    assert len(frames) == FRAMES - 20
+    assert all(frame_ids == ids[0] for frame_ids in _ids(frames))
+
+
+def test_resume_keeps_track_ids(video, tmp_path, monkeypatch):
+    monkeypatch.chdir(REPO)
+    monkeypatch.setattr(track, "DETECTION_DB", str(tmp_path / "detections.db"))
+    monkeypatch.setattr(track, "CHECKPOINT_SECONDS", 1.0)   # every 10 frames at 10 fps
+    ids = {}   # tracker frame number -> track IDs, later runs overwrite re-tracked frames
+    track_raw = track.track_raw
+
+    def recording_track_raw(tracker, raw, shape):
+        detections = track_raw(tracker, raw, shape)
+        ids[tracker.frame_id] = sorted(detections[:, 5].tolist())
+        return detections
+
+    monkeypatch.setattr(track, "track_raw", recording_track_raw)
+
+    def run(name, **kwargs):
+        return track.run_resumable(FrameIndexModel(b_from=12, **kwargs), video,
+                                   str(tmp_path / f"{name}.mp4"), str(tmp_path / f"{name}.ckpt"), "mp4v")
+
+    def logged():
+        with sqlite3.connect(tmp_path / "detections.db") as conn:
+            return conn.execute("SELECT session, frame, track_id FROM detections"
+                                " ORDER BY session, frame, track_id").fetchall()
+
+    run("straight")
+    expected, ids = ids, {}
+    rows = logged()
+
+    # Crash after the frame-10 checkpoint; bison B first appears after it
+    with pytest.raises(RuntimeError):
+        run("resumed", crash_at=15)
+    assert os.path.exists(tmp_path / "resumed.ckpt")
+    stats = run("resumed")
+
+    assert stats.frame_count == FRAMES
+    assert ids == expected
+    assert stats.distinct.counts()["total"] == 2
+    assert not os.path.exists(tmp_path / "resumed.ckpt")
+    cache = track.DetectionCache(video, track.MODEL_WEIGHTS)
+    assert cache.load() and len(cache.frames) == FRAMES
+    assert not [p for p in os.listdir(tmp_path) if ".part" in p]
+    # Same file, same log session: the reruns add no duplicate rows
+    assert logged() == rows and len(rows) == len(set(rows))
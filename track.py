@@ -2,14 +2,33 @@
 """
 Headless Bison Tracking Script for Server/Cluster Environment
 No GUI display - perfect for remote servers and clusters.
+
+Sequential run (default):        python track.py --source DJI_bison.MP4
+Parallel offline run (files):    python track.py --source DJI_bison.MP4 --workers 4
+Batch of files (resumable):      python track.py --batch flights/ --workers 2
 """
 
 import os
+import json
+import glob
 import time
+import pickle
+import queue
+import types
+import shutil
+import hashlib
+import argparse
+import threading
+import subprocess
+import multiprocessing
+from collections import OrderedDict
 import cv2
 import numpy as np
+import yaml
 from ultralytics import YOLO
 
+from rtsp_bison_tracker_2 import DetectionLog, DistinctTrackCounter
+
 # ─── PARAMETERS ────────────────────────────────────────────────────────────────
 # VIDEO_SOURCE   = "DJI_bison.MP4"
 VIDEO_SOURCE   = "rtsps://cr-14.hostedcloudvideo.com:443/publish-cr/_definst_/G0W2EP7IKAXYETM1ANDVQ6DBRXNXCN7VK3MM7SP9/6b55ae911a8dbd2bd7d3a75ae4547acc976d0b9e?action=PLAY"  # Path to your video file
@@ -19,172 +38,1070 @@ TRACKER_CFG    = "args.yaml"
 MODEL_WEIGHTS = "best.pt"
 CLASS_NAMES    = ["bison"]
 MIN_CONFIDENCE = 0.3
-HEADLESS_MODE  = True
+HEADLESS_MODE  = True              # never open a preview window (use --show to preview)
+OUTPUT_ENCODER = "ffmpeg"          # "ffmpeg" (H.264 via ffmpeg pipe) or "mp4v" (OpenCV)
+WRITER_QUEUE_SIZE = 64             # frames buffered between the main loop and the encoder
 PROGRESS_INTERVAL = 100
+DETECTION_DB   = "detections.db"   # durable detection log shared with the RTSP tracker
+PARALLEL_WORKERS = 0               # >0: split video files into chunks tracked in parallel
+CHUNK_SECONDS  = 60.0              # length of one parallel chunk
+CHUNK_OVERLAP  = 30                # frames each chunk re-tracks before its start, for ID stitching
+STITCH_IOU     = 0.5               # min box IoU for two chunk-local IDs to be the same animal
+DETECTION_CACHE = True             # keep raw detections in a sidecar next to video files
+CACHE_SUFFIX   = ".dets.npz"       # sidecar file name: <video><suffix>
+CACHE_CONF_FLOOR = 0.05            # detections kept in the cache (MIN_CONFIDENCE is applied on replay)
+CACHE_FINGERPRINT_BYTES = 1 << 20  # bytes hashed from the head and tail of a file
+BATCH_OUTPUT_DIR = "tracked"       # outputs, checkpoints and summaries of --batch runs
+BATCH_PATTERNS = ("*.mp4", "*.MP4", "*.mov", "*.MOV", "*.avi", "*.mkv")
+CHECKPOINT_SECONDS = 60.0          # video seconds between checkpoints (one output part each)
+SAMPLE_FPS     = 0                 # >0: analyze only this many frames per second of video
 # ──────────────────────────────────────────────────────────────────────────────
 
-def main():
-    print("=" * 60)
-    print("Headless Bison Tracking with ByteTracker")
-    print("=" * 60)
-    
-    # 1. Load model and verify tracker config
-    print(f"Loading model: {MODEL_WEIGHTS}")
-    model = YOLO(MODEL_WEIGHTS)
-    
-    if not os.path.isfile(TRACKER_CFG):
-        raise FileNotFoundError(f"Tracker config not found: {TRACKER_CFG}")
-    print(f"Using tracker config: {TRACKER_CFG}")
+# Per-frame detections are (N, 6) arrays: x1, y1, x2, y2, conf, track_id (-1 = none)
+NO_DETECTIONS = np.zeros((0, 6), dtype=np.float64)
+# Raw (untracked) detections in the cache are (N, 6) arrays: x1, y1, x2, y2, conf, cls
+NO_RAW = np.zeros((0, 6), dtype=np.float32)
+
+
+def extract_detections(results):
+    """Bison boxes from a YOLO tracking result as an (N, 6) array."""
+    boxes = results.boxes
+    if boxes is None or len(boxes) == 0:
+        return NO_DETECTIONS
+    coords     = boxes.xyxy.tolist()
+    cls_list   = boxes.cls.tolist()
+    ids_tensor = boxes.id
+    id_list    = ids_tensor.tolist() if ids_tensor is not None else [None]*len(cls_list)
+    conf_list  = boxes.conf.tolist()
+
+    rows = []
+    for (x1, y1, x2, y2), tid, cls, conf in zip(coords, id_list, cls_list, conf_list):
+        cls = int(cls)
+        if cls >= len(CLASS_NAMES) or CLASS_NAMES[cls] != "bison":
+            continue
+        rows.append((x1, y1, x2, y2, conf, tid if tid is not None else -1))
+    return np.array(rows, dtype=np.float64) if rows else NO_DETECTIONS
+
+
+def draw_detections(frame, detections, fps_display, frame_count, total_frames):
+    """Draw boxes, IDs and the count / FPS / frame overlays onto the frame."""
+    height, width = frame.shape[:2]
+    for x1, y1, x2, y2, conf, tid in detections.tolist():
+        x1, y1, x2, y2 = map(int, (x1, y1, x2, y2))
+
+        # Draw bounding box
+        cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+
+        # Draw ID and confidence
+        if tid >= 0:
+            label = f"ID {int(tid)} ({conf:.2f})"
+        else:
+            label = f"Bison ({conf:.2f})"
+
+        cv2.putText(frame, label,
+                   (x1, y1 - 10),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+
+    # Overlay count and FPS on frame
+    cv2.putText(frame, f"Count: {len(detections)}",
+               (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 255), 2)
+    cv2.putText(frame, f"FPS: {fps_display:.1f}",
+               (width - 140, 30),
+               cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 0), 2)
+    cv2.putText(frame, f"Frame: {frame_count}/{total_frames}",
+               (10, height - 20),
+               cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+
+
+class RunStats:
+    """Counters, distinct-ID windows and the detection log for one run."""
+    def __init__(self, source, fps, total_frames, step=1):
+        self.source = source
+        self.fps = fps
+        self.total_frames = total_frames
+        self.step = step                         # source frames per analyzed frame
+        self.frame_count = 0
+        self.total_bison_detections = 0
+        self.max_bison_in_frame = 0
+        self.distinct = DistinctTrackCounter()   # windows measured in video time
+        self.start_time = time.time()
+
+        # Detections are persisted by a background writer; frame time is the
+        # run's start time plus the frame's position in the video. Runs over
+        # the same file share one session keyed by its content, so replays and
+        # resumes log each source frame only once.
+        self.detection_log = DetectionLog(DETECTION_DB, drop_when_full=False)
+        key = f"file:{file_fingerprint(source)}" if os.path.isfile(source) else None
+        self.detection_log.start(source=source, key=key)
+
+    def add(self, detections):
+        self.frame_count += 1
+        bison_count = len(detections)
+        self.detection_log.record(self.start_time + self.frame_count / self.fps,
+                                  (self.frame_count - 1) * self.step + 1, detections)
+        self.distinct.update(self.frame_count / self.fps, detections[:, 5].tolist())
+        self.total_bison_detections += bison_count
+        self.max_bison_in_frame = max(self.max_bison_in_frame, bison_count)
+
+        # Progress updates (no GUI display in headless mode)
+        if self.frame_count % PROGRESS_INTERVAL == 0 or self.frame_count == 1:
+            elapsed = time.time() - self.start_time
+            avg_fps = self.frame_count / elapsed
+            if self.total_frames > 0:
+                progress = (self.frame_count / self.total_frames) * 100
+                eta = (elapsed / self.frame_count) * (self.total_frames - self.frame_count)
+            else:
+                progress = eta = 0.0
 
-    # 2. Open video source
-    print(f"Opening video: {VIDEO_SOURCE}")
-    cap = cv2.VideoCapture(VIDEO_SOURCE)
+            print(f"Frame {self.frame_count:5d}/{self.total_frames} ({progress:5.1f}%) | "
+                  f"Bison: {bison_count:2d} | "
+                  f"FPS: {avg_fps:5.1f} | "
+                  f"ETA: {eta/60:4.1f}m")
+
+    def close(self):
+        self.detection_log.stop()
+
+    def state(self):
+        """Picklable counters for a checkpoint (the detection log is not included)."""
+        with self.distinct.lock:
+            seen = {name: list(ids.items()) for name, ids in self.distinct.seen.items()}
+            distinct_total = self.distinct.total
+        return {
+            'frame_count': self.frame_count,
+            'total_bison_detections': self.total_bison_detections,
+            'max_bison_in_frame': self.max_bison_in_frame,
+            'distinct_seen': seen,
+            'distinct_total': distinct_total,
+        }
+
+    def restore(self, state):
+        self.frame_count = state['frame_count']
+        self.total_bison_detections = state['total_bison_detections']
+        self.max_bison_in_frame = state['max_bison_in_frame']
+        with self.distinct.lock:
+            self.distinct.seen = {name: OrderedDict(items)
+                                  for name, items in state['distinct_seen'].items()}
+            self.distinct.total = state['distinct_total']
+
+    def summary(self):
+        """JSON-ready run totals (used for the batch reports)."""
+        frame_count = max(self.frame_count, 1)
+        return {
+            'source': self.source,
+            'frames': self.frame_count,
+            'processing_seconds': round(time.time() - self.start_time, 1),
+            'total_bison_detections': self.total_bison_detections,
+            'max_bison_in_frame': self.max_bison_in_frame,
+            'avg_bison_per_frame': round(self.total_bison_detections / frame_count, 2),
+            'distinct_bison': self.distinct.counts(),
+        }
+
+    def print_summary(self, output_path):
+        total_time = time.time() - self.start_time
+        frame_count = max(self.frame_count, 1)
+        print("\n" + "=" * 60)
+        print("PROCESSING COMPLETED")
+        print("=" * 60)
+        print(f"Total frames processed: {self.frame_count:,}")
+        print(f"Total processing time: {total_time:.1f} seconds ({total_time/60:.1f} minutes)")
+        print(f"Average processing FPS: {self.frame_count/total_time:.1f}")
+        print(f"Max bison in single frame: {self.max_bison_in_frame}")
+        distinct_counts = self.distinct.counts()
+        print(f"Distinct bison (track IDs): {distinct_counts['total']} "
+              f"(last minute: {distinct_counts['last_minute']}, "
+              f"last hour: {distinct_counts['last_hour']}, "
+              f"last day: {distinct_counts['last_day']})")
+        print(f"Average bison per frame: {self.total_bison_detections/frame_count:.1f}")
+        if output_path is None:   # statistics-only run
+            print("=" * 60)
+            return
+        print(f"Output saved to: {output_path}")
+
+        # File size info
+        if os.path.exists(output_path):
+            file_size = os.path.getsize(output_path) / (1024*1024)  # MB
+            print(f"Output file size: {file_size:.1f} MB")
+
+        print("=" * 60)
+
+
+def open_video(source):
+    print(f"Opening video: {source}")
+    cap = cv2.VideoCapture(source)
     if not cap.isOpened():
-        raise RuntimeError(f"Cannot open source: {VIDEO_SOURCE}")
+        raise RuntimeError(f"Cannot open source: {source}")
 
     # Get video properties
     width  = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
     height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
     fps    = cap.get(cv2.CAP_PROP_FPS) or 30.0
     total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    
+
     print(f"Video properties:")
     print(f"  Resolution: {width}x{height}")
     print(f"  FPS: {fps:.1f}")
     print(f"  Total frames: {total_frames}")
     print(f"  Duration: {total_frames/fps:.1f} seconds")
+    return cap, width, height, fps, total_frames
+
+
+class AsyncVideoWriter:
+    """
+    Encodes frames on a background thread so inference and encoding overlap.
+    The bounded queue applies backpressure instead of dropping frames.
+    With encoder="ffmpeg", raw BGR frames are piped to ffmpeg (libx264);
+    if ffmpeg is not on PATH, OpenCV's mp4v writer is used instead.
+    """
+    def __init__(self, path, fps, size, encoder=OUTPUT_ENCODER, queue_size=WRITER_QUEUE_SIZE):
+        self.path = path
+        self.fps = fps
+        self.width, self.height = size
+        self.q = queue.Queue(maxsize=queue_size)
+        self.error = None
+        self.proc = None
+        self.writer = None
+
+        if encoder == "ffmpeg" and shutil.which("ffmpeg") is None:
+            print("ffmpeg not found on PATH; falling back to OpenCV mp4v encoding.")
+            encoder = "mp4v"
+        self.encoder = encoder
+
+        if encoder == "ffmpeg":
+            cmd = [
+                "ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+                "-f", "rawvideo", "-pix_fmt", "bgr24",
+                "-s:v", f"{self.width}x{self.height}", "-r", f"{fps}",
+                "-i", "-",
+                "-an",
+                "-c:v", "libx264", "-preset", "veryfast", "-crf", "23",
+                "-pix_fmt", "yuv420p",
+                "-movflags", "+faststart",
+                path,
+            ]
+            self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE,
+                                         stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        else:
+            fourcc = cv2.VideoWriter_fourcc(*"mp4v")
+            self.writer = cv2.VideoWriter(path, fourcc, fps, (self.width, self.height))
+
+        self.thread = threading.Thread(target=self._encode_loop, daemon=True)
+        self.thread.start()
+
+    def _encode_loop(self):
+        while True:
+            frame = self.q.get()
+            if frame is None:
+                break
+            if self.error is not None:
+                continue   # keep draining so write() never blocks forever
+            try:
+                if self.proc:
+                    self.proc.stdin.write(frame.tobytes())
+                else:
+                    self.writer.write(frame)
+            except Exception as e:
+                self.error = e
+
+    def write(self, frame):
+        if self.error is not None:
+            raise RuntimeError(f"Video encoder failed: {self.error}")
+        self.q.put(frame)
+
+    def release(self):
+        self.q.put(None)
+        self.thread.join()
+        if self.proc:
+            try:
+                self.proc.stdin.close()
+            except Exception:
+                pass
+            self.proc.wait()
+            if self.proc.returncode != 0:
+                err = self.proc.stderr.read().decode(errors="ignore").strip()
+                print(f"ffmpeg exited with code {self.proc.returncode}: {err}")
+        if self.writer:
+            self.writer.release()
+
+
+def emit_frame(writer, frame, show=False):
+    """Queue an annotated frame for encoding; returns False if the user quits the preview."""
+    writer.write(frame)
+    if show:
+        cv2.imshow("Bison Tracking", frame)
+        if cv2.waitKey(1) & 0xFF == ord('q'):
+            return False
+    return True
 
-    # 3. Prepare VideoWriter to save output
-    fourcc = cv2.VideoWriter_fourcc(*"mp4v")
-    writer = cv2.VideoWriter(OUTPUT_PATH, fourcc, fps, (width, height))
-    print(f"Output will be saved to: {OUTPUT_PATH}")
 
-    # 4. Processing loop
+# ─── DETECTION CACHE ──────────────────────────────────────────────────────────
+def file_fingerprint(path, chunk=CACHE_FINGERPRINT_BYTES):
+    """Fast content key: file size plus a hash of its first and last `chunk` bytes."""
+    if not os.path.isfile(path):
+        return os.path.basename(path)   # e.g. hub weights resolved by name
+    size = os.path.getsize(path)
+    h = hashlib.blake2b(str(size).encode(), digest_size=16)
+    with open(path, "rb") as f:
+        h.update(f.read(chunk))
+        if size > chunk:
+            f.seek(max(chunk, size - chunk))
+            h.update(f.read(chunk))
+    return h.hexdigest()
+
+
+class DetectionCache:
+    """
+    Raw per-frame detections for one video/weights pair, stored in a sidecar
+    next to the video. Frames are kept as one (M, 6) float32 array plus
+    per-frame offsets, so a re-run can replay tracking, statistics and
+    rendering without running the model.
+    """
+    def __init__(self, source, weights):
+        self.path = source + CACHE_SUFFIX
+        self.key = f"{file_fingerprint(source)}:{file_fingerprint(weights)}:{CACHE_CONF_FLOOR}"
+        self.frames = []
+        self.meta = {}
+
+    def load(self):
+        """Read the sidecar; returns False if it is missing or belongs to another video/model."""
+        if not os.path.isfile(self.path):
+            return False
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                if str(data["key"]) != self.key:
+                    print(f"Detection cache {self.path} is stale; re-running inference.")
+                    return False
+                self.frames = self.unpack(data["boxes"], data["offsets"])
+                self.meta = {k: float(data[k]) for k in ("fps", "width", "height")}
+        except Exception as e:
+            print(f"Could not read detection cache {self.path}: {e}")
+            return False
+        return True
+
+    def append(self, raw):
+        self.frames.append(raw)
+
+    @staticmethod
+    def pack(frames):
+        """Per-frame (N, 6) arrays -> one (M, 6) float32 array plus len(frames) + 1 offsets."""
+        offsets = np.zeros(len(frames) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(f) for f in frames])
+        boxes = np.concatenate(frames) if frames else NO_RAW
+        return boxes.astype(np.float32), offsets
+
+    @staticmethod
+    def unpack(boxes, offsets):
+        return np.split(boxes, offsets[1:-1]) if len(offsets) > 1 else []
+
+    def save(self, fps, width, height):
+        """Write the sidecar atomically (a partial file never replaces a good one)."""
+        boxes, offsets = self.pack(self.frames)
+        tmp = self.path + ".tmp.npz"
+        np.savez_compressed(tmp, key=np.array(self.key), boxes=boxes,
+                            offsets=offsets, fps=fps, width=width, height=height)
+        os.replace(tmp, self.path)
+        print(f"Cached {len(self.frames)} frames of detections to {self.path} "
+              f"({os.path.getsize(self.path) / 1024:.0f} KB)")
+
+
+def extract_raw(results):
+    """All boxes from a YOLO predict result as an (N, 6) x1, y1, x2, y2, conf, cls array."""
+    boxes = results.boxes
+    if boxes is None or len(boxes) == 0:
+        return NO_RAW
+    return np.column_stack([np.asarray(boxes.xyxy.tolist()).reshape(-1, 4),
+                            boxes.conf.tolist(), boxes.cls.tolist()]).astype(np.float32)
+
+
+def load_tracker_cfg(path=TRACKER_CFG):
+    with open(path) as f:
+        return types.SimpleNamespace(**yaml.safe_load(f))
+
+
+def make_tracker(cfg, step=1):
+    """
+    Standalone ByteTrack instance fed from raw detections instead of model.track().
+    When only every `step`-th frame is analyzed, track_buffer (counted in
+    analyzed frames) is shrunk so lost tracks still expire after the same
+    amount of video time. The matching thresholds (track_high_thresh,
+    new_track_thresh, match_thresh) are deliberately left as configured: the
+    Kalman filter learns velocity per analyzed frame, so steady motion over a
+    larger gap is still predicted, but fast or erratic movement between
+    sparse samples can fail the IoU match and show up as ID switches. Lower
+    match_thresh in args.yaml if that happens at low --sample-fps.
+    """
+    from ultralytics.trackers.byte_tracker import BYTETracker
+    if step > 1:
+        cfg = types.SimpleNamespace(**vars(cfg))
+        cfg.track_buffer = max(1, round(cfg.track_buffer / step))
+    return BYTETracker(args=cfg)
+
+
+def sample_step(fps, sample_fps):
+    """Analyze every n-th frame so that roughly sample_fps frames per second remain."""
+    if not sample_fps or sample_fps >= fps:
+        return 1
+    return max(1, round(fps / sample_fps))
+
+
+def skip_frames(cap, n, seek=False):
+    """
+    Advance past n frames. With the FFmpeg backend grab() still decodes every
+    frame and only saves the retrieve() copy and colour conversion, so it does
+    not make sparse sampling much cheaper than reading; the saving comes from
+    skipping inference. seek jumps via CAP_PROP_POS_FRAMES instead (faster for
+    long gaps, but only as exact as the container's keyframe index).
+    Returns False at end of stream.
+    """
+    if seek:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, cap.get(cv2.CAP_PROP_POS_FRAMES) + n)
+        return True
+    for _ in range(n):
+        if not cap.grab():
+            return False
+    return True
+
+
+def track_raw(tracker, raw, shape):
+    """Run one frame of raw detections through ByteTrack; returns bison rows as (N, 6)."""
+    from ultralytics.engine.results import Boxes
+    raw = raw[raw[:, 4] >= MIN_CONFIDENCE]   # same pre-filter as model.track(conf=...)
+    tracks = tracker.update(Boxes(raw, shape))
+    if len(tracks) == 0:
+        return NO_DETECTIONS
+    # ByteTrack rows: x1, y1, x2, y2, track_id, score, cls, idx
+    rows = [(x1, y1, x2, y2, score, tid)
+            for x1, y1, x2, y2, tid, score, cls, _ in tracks.tolist()
+            if int(cls) < len(CLASS_NAMES) and CLASS_NAMES[int(cls)] == "bison"]
+    return np.array(rows, dtype=np.float64) if rows else NO_DETECTIONS
+
+
+# ─── SEQUENTIAL TRACKING ──────────────────────────────────────────────────────
+def run_sequential(model, source, output_path, encoder=OUTPUT_ENCODER, show=not HEADLESS_MODE,
+                   cache=None, render=True, sample_fps=SAMPLE_FPS, seek=False):
+    """
+    Track a video or stream frame by frame. With a DetectionCache, the model
+    only detects (at CACHE_CONF_FLOOR) and a standalone ByteTrack does the
+    tracking, so a later replay of the cache gives identical tracks.
+    With sample_fps, frames between analyzed ones are skipped undecoded and
+    the output video / statistics run at the effective frame rate.
+    """
+    cap, width, height, fps, total_frames = open_video(source)
+    step = sample_step(fps, sample_fps)
+    if step > 1:
+        cache = None   # a sampled pass would leave gaps in the cache
+        fps, total_frames = fps / step, -(-total_frames // step)
+        print(f"Sampling every {step} frames ({fps:.1f} analyzed frames/s)")
+
+    writer = None
+    if render:
+        # Encoder runs on its own thread so it overlaps with inference
+        writer = AsyncVideoWriter(output_path, fps, (width, height), encoder)
+        print(f"Output will be saved to: {output_path} ({writer.encoder})")
+    standalone = cache is not None or step > 1
+    tracker = make_tracker(load_tracker_cfg(), step) if standalone else None
+
     print(f"\nStarting processing...")
     print(f"Progress updates every {PROGRESS_INTERVAL} frames")
     print("-" * 60)
-    
-    frame_count = 0
-    start_time = time.time()
-    total_bison_detections = 0
-    max_bison_in_frame = 0
-    
+
+    stats = RunStats(source, fps, total_frames, step)
+    completed = False
     try:
         while True:
             loop_start = time.time()
+            if step > 1 and stats.frame_count and not skip_frames(cap, step - 1, seek):
+                completed = True
+                break
             ret, frame = cap.read()
             if not ret:
+                completed = True
                 break
 
-            frame_count += 1
-
             # Rotate 180° because video is upside down
             #frame = cv2.rotate(frame, cv2.ROTATE_180)
 
-            # Detect + track via ByteTrack
-            results = model.track(
-                source=frame,
-                tracker=TRACKER_CFG,
-                conf=MIN_CONFIDENCE,
-                persist=True,
-                verbose=False  # Suppress YOLO output for cleaner logs
-            )[0]
-
-            # Extract and convert for iteration
-            boxes = results.boxes
-            bison_count = 0
-            
-            if boxes is not None:
-                coords     = boxes.xyxy.tolist()
-                cls_list   = boxes.cls.tolist()
-                ids_tensor = boxes.id
-                id_list    = ids_tensor.tolist() if ids_tensor is not None else [None]*len(cls_list)
-                conf_list  = boxes.conf.tolist()
-
-                # Count & draw
-                for (x1, y1, x2, y2), tid, cls, conf in zip(coords, id_list, cls_list, conf_list):
-                    cls = int(cls)
-                    if cls >= len(CLASS_NAMES) or CLASS_NAMES[cls] != "bison":
-                        continue
-
-                    bison_count += 1
-                    x1, y1, x2, y2 = map(int, (x1, y1, x2, y2))
-                    
-                    # Draw bounding box
-                    cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-                    
-                    # Draw ID and confidence
-                    if tid is not None:
-                        label = f"ID {int(tid)} ({conf:.2f})"
-                    else:
-                        label = f"Bison ({conf:.2f})"
-                        
-                    cv2.putText(frame, label,
-                               (x1, y1 - 10),
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
-                    
-            # Update statistics
-            total_bison_detections += bison_count
-            max_bison_in_frame = max(max_bison_in_frame, bison_count)
+            if standalone:
+                # Detect only; tracking runs on the raw boxes
+                results = model.predict(source=frame, conf=CACHE_CONF_FLOOR, verbose=False)[0]
+                raw = extract_raw(results)
+                if cache is not None:
+                    cache.append(raw)
+                detections = track_raw(tracker, raw, (height, width))
+            else:
+                # Detect + track via ByteTrack
+                results = model.track(
+                    source=frame,
+                    tracker=TRACKER_CFG,
+                    conf=MIN_CONFIDENCE,
+                    persist=True,
+                    verbose=False  # Suppress YOLO output for cleaner logs
+                )[0]
+                detections = extract_detections(results)
 
-            # Overlay count and FPS on frame
-            fps_display = 1.0 / (time.time() - loop_start + 1e-6)
-            cv2.putText(frame, f"Count: {bison_count}",
-                       (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 255), 2)
-            cv2.putText(frame, f"FPS: {fps_display:.1f}",
-                       (width - 140, 30),
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 0), 2)
-            cv2.putText(frame, f"Frame: {frame_count}/{total_frames}",
-                       (10, height - 20),
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-
-            # Write frame to output file
-            cv2.imshow("Bison Tracking", frame) 
-            if cv2.waitKey(1) & 0xFF == ord('q'):
-                break
-            writer.write(frame)
+            # Update statistics
+            stats.add(detections)
 
-            # Progress updates (no GUI display in headless mode)
-            if frame_count % PROGRESS_INTERVAL == 0 or frame_count == 1:
-                elapsed = time.time() - start_time
-                progress = (frame_count / total_frames) * 100
-                eta = (elapsed / frame_count) * (total_frames - frame_count)
-                avg_fps = frame_count / elapsed
-                
-                print(f"Frame {frame_count:5d}/{total_frames} ({progress:5.1f}%) | "
-                      f"Bison: {bison_count:2d} | "
-                      f"FPS: {avg_fps:5.1f} | "
-                      f"ETA: {eta/60:4.1f}m")
+            if writer is not None:
+                fps_display = 1.0 / (time.time() - loop_start + 1e-6)
+                draw_detections(frame, detections, fps_display, stats.frame_count, total_frames)
+                if not emit_frame(writer, frame, show):
+                    break
 
     except KeyboardInterrupt:
-        print(f"\nProcessing interrupted by user at frame {frame_count}")
+        print(f"\nProcessing interrupted by user at frame {stats.frame_count}")
     except Exception as e:
         print(f"\nError during processing: {e}")
     finally:
         # Cleanup
         cap.release()
+        if writer is not None:
+            writer.release()
+        stats.close()
+        if show:
+            cv2.destroyAllWindows()
+    # Only a complete pass is cached; an interrupted one would replay short
+    if cache is not None and completed:
+        cache.save(fps, width, height)
+    return stats
+
+
+def run_cached(cache, source, output_path, encoder=OUTPUT_ENCODER, show=not HEADLESS_MODE,
+               render=True, sample_fps=SAMPLE_FPS, seek=False):
+    """Replay tracking, statistics and (optionally) rendering from a loaded DetectionCache."""
+    step = sample_step(cache.meta["fps"], sample_fps)
+    fps = cache.meta["fps"] / step
+    width, height = int(cache.meta["width"]), int(cache.meta["height"])
+    frames = cache.frames[::step]
+    total_frames = len(frames)
+    print(f"Replaying {total_frames} cached frames from {cache.path}"
+          + (f" (every {step}th frame)" if step > 1 else ""))
+
+    cap = writer = None
+    if render:
+        cap = cv2.VideoCapture(source)
+        writer = AsyncVideoWriter(output_path, fps, (width, height), encoder)
+        print(f"Rendering output to: {output_path} ({writer.encoder})")
+    tracker = make_tracker(load_tracker_cfg(), step)
+
+    stats = RunStats(source, fps, total_frames, step)
+    try:
+        for raw in frames:
+            loop_start = time.time()
+            detections = track_raw(tracker, raw, (height, width))
+            stats.add(detections)
+            if writer is None:
+                continue
+            if step > 1 and stats.frame_count > 1 and not skip_frames(cap, step - 1, seek):
+                break
+            ret, frame = cap.read()
+            if not ret:
+                break
+            fps_display = 1.0 / (time.time() - loop_start + 1e-6)
+            draw_detections(frame, detections, fps_display, stats.frame_count, total_frames)
+            if not emit_frame(writer, frame, show):
+                break
+    except KeyboardInterrupt:
+        print(f"\nReplay interrupted by user at frame {stats.frame_count}")
+    finally:
+        if cap is not None:
+            cap.release()
+        if writer is not None:
+            writer.release()
+        stats.close()
+        if show:
+            cv2.destroyAllWindows()
+    return stats
+
+
+# ─── PARALLEL CHUNKED TRACKING ────────────────────────────────────────────────
+_worker_model = None
+
+
+def _init_worker(weights):
+    global _worker_model
+    _worker_model = YOLO(weights)
+
+
+def _track_chunk(task):
+    """
+    Worker: track frames [warmup_start, end) of a video file with a fresh
+    ByteTrack state. Returns (warmup_start, per-frame detections) with
+    chunk-local track IDs.
+
+    The tracker is built here rather than through model.track(): Ultralytics
+    binds `persist` into its callbacks on the first track() call of a
+    predictor, so a per-chunk persist=False would never reset it.
+    """
+    source, warmup_start, end = task
+    cap = cv2.VideoCapture(source)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, warmup_start)
+    tracker = make_tracker(load_tracker_cfg())
+    frames = []
+    idx = warmup_start
+    while end is None or idx < end:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        results = _worker_model.predict(source=frame, conf=CACHE_CONF_FLOOR, verbose=False)[0]
+        frames.append(track_raw(tracker, extract_raw(results), frame.shape[:2]))
+        idx += 1
+    cap.release()
+    return warmup_start, frames
+
+
+def _box_iou(a, b):
+    """Pairwise IoU between (N, 4) and (M, 4) xyxy boxes."""
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+class TrackStitcher:
+    """
+    Joins chunk-local ByteTrack IDs into global IDs. Chunks overlap by a few
+    frames; IDs whose boxes coincide (IoU >= STITCH_IOU) in the overlap are
+    voted together and matched greedily, everything else gets a new ID.
+    """
+    def __init__(self, iou=STITCH_IOU):
+        self.iou = iou
+        self.next_id = 1
+        self.frames = []          # global-ID detections, indexed by frame
+
+    def add_chunk(self, start, frames):
+        """`frames` covers [start, start + len(frames)); frames < len(self.frames) overlap."""
+        # Keep frame indices aligned if an earlier chunk came back short
+        while len(self.frames) < start:
+            self.frames.append(NO_DETECTIONS)
+        votes = {}
+        overlap = len(self.frames) - start
+        for offset in range(min(overlap, len(frames))):
+            prev, cur = self.frames[start + offset], frames[offset]
+            if len(prev) == 0 or len(cur) == 0:
+                continue
+            iou = _box_iou(cur[:, :4], prev[:, :4])
+            for i, j in zip(*np.nonzero(iou >= self.iou)):
+                key = (int(cur[i, 5]), int(prev[j, 5]))
+                if key[0] >= 0 and key[1] >= 0:
+                    votes[key] = votes.get(key, 0) + 1
+
+        mapping, used = {}, set()
+        for (local_id, global_id), _ in sorted(votes.items(), key=lambda kv: -kv[1]):
+            if local_id not in mapping and global_id not in used:
+                mapping[local_id] = global_id
+                used.add(global_id)
+
+        for detections in frames[overlap:]:
+            mapped = detections.copy()
+            for row in mapped:
+                if row[5] < 0:
+                    continue
+                local_id = int(row[5])
+                if local_id not in mapping:
+                    mapping[local_id] = self.next_id
+                    self.next_id += 1
+                row[5] = mapping[local_id]
+            self.frames.append(mapped)
+
+
+def run_parallel(source, output_path, workers, chunk_seconds=CHUNK_SECONDS, overlap=CHUNK_OVERLAP,
+                 encoder=OUTPUT_ENCODER, show=not HEADLESS_MODE, render=True):
+    """Track chunks of a video file in worker processes, stitch IDs, then render (optionally)."""
+    cap, width, height, fps, total_frames = open_video(source)
+    cap.release()
+    if total_frames <= 0:
+        raise RuntimeError("Parallel mode needs a video file with a known frame count")
+
+    chunk_frames = max(int(chunk_seconds * fps), overlap + 1)
+    starts = list(range(0, total_frames, chunk_frames))
+    tasks = []
+    for i, start in enumerate(starts):
+        end = starts[i + 1] if i + 1 < len(starts) else None   # last chunk reads to EOF
+        tasks.append((source, max(0, start - overlap), end))
+    print(f"\nTracking {len(tasks)} chunks of {chunk_frames} frames on {workers} workers "
+          f"({overlap} frames overlap)...")
+
+    stitcher = TrackStitcher()
+    track_start = time.time()
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(workers, initializer=_init_worker, initargs=(MODEL_WEIGHTS,)) as pool:
+        for n, (start, frames) in enumerate(pool.imap(_track_chunk, tasks), 1):
+            stitcher.add_chunk(start, frames)
+            print(f"Chunk {n}/{len(tasks)} done | frames tracked: {len(stitcher.frames)} | "
+                  f"elapsed: {time.time() - track_start:.1f}s")
+
+    # Render pass: identical overlays / stats to a sequential run
+    cap = writer = None
+    if render:
+        cap = cv2.VideoCapture(source)
+        writer = AsyncVideoWriter(output_path, fps, (width, height), encoder)
+        print(f"Rendering output to: {output_path} ({writer.encoder})")
+    stats = RunStats(source, fps, total_frames)
+    stats.start_time = track_start
+    try:
+        for detections in stitcher.frames:
+            loop_start = time.time()
+            if writer is None:
+                stats.add(detections)
+                continue
+            ret, frame = cap.read()
+            if not ret:
+                break
+            stats.add(detections)
+            fps_display = 1.0 / (time.time() - loop_start + 1e-6)
+            draw_detections(frame, detections, fps_display, stats.frame_count, total_frames)
+            if not emit_frame(writer, frame, show):
+                break
+    except KeyboardInterrupt:
+        print(f"\nRendering interrupted by user at frame {stats.frame_count}")
+    finally:
+        if cap is not None:
+            cap.release()
+        if writer is not None:
+            writer.release()
+        stats.close()
+        if show:
+            cv2.destroyAllWindows()
+    return stats
+
+
+# ─── BATCH MODE ───────────────────────────────────────────────────────────────
+def load_checkpoint(path, key):
+    """Checkpoint dict for this video/weights pair, or None to start from frame 0."""
+    if not path or not os.path.isfile(path):
+        return None
+    try:
+        with open(path, "rb") as f:
+            ckpt = pickle.load(f)
+    except Exception as e:
+        print(f"Ignoring unreadable checkpoint {path}: {e}")
+        return None
+    return ckpt if ckpt.get('key') == key else None
+
+
+def save_checkpoint(path, ckpt):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(ckpt, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def save_raw_part(path, frames):
+    """Raw detections of one output part, written next to it (atomically)."""
+    boxes, offsets = DetectionCache.pack(frames)
+    tmp = path + ".tmp.npz"
+    np.savez_compressed(tmp, boxes=boxes, offsets=offsets)
+    os.replace(tmp, path)
+
+
+def load_raw_part(path):
+    with np.load(path, allow_pickle=False) as data:
+        return DetectionCache.unpack(data["boxes"], data["offsets"])
+
+
+def join_parts(parts, output_path):
+    """Concatenate output parts into one file (ffmpeg stream copy, else re-encode)."""
+    if len(parts) == 1:
+        os.replace(parts[0], output_path)
+        return
+    if shutil.which("ffmpeg"):
+        list_path = output_path + ".parts.txt"
+        with open(list_path, "w") as f:
+            for part in parts:
+                f.write(f"file '{os.path.abspath(part)}'\n")
+        proc = subprocess.run(["ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+                               "-f", "concat", "-safe", "0", "-i", list_path,
+                               "-c", "copy", "-movflags", "+faststart", output_path],
+                              capture_output=True)
+        os.remove(list_path)
+        if proc.returncode != 0:
+            raise RuntimeError(f"ffmpeg concat failed: {proc.stderr.decode(errors='ignore').strip()}")
+    else:
+        writer = None
+        for part in parts:
+            cap = cv2.VideoCapture(part)
+            if writer is None:
+                size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+                writer = AsyncVideoWriter(output_path, cap.get(cv2.CAP_PROP_FPS) or 30.0, size, "mp4v")
+            while True:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                writer.write(frame)
+            cap.release()
         writer.release()
-        # No cv2.destroyAllWindows() needed in headless mode
+    for part in parts:
+        os.remove(part)
+
+
+def run_resumable(model, source, output_path, checkpoint_path, encoder=OUTPUT_ENCODER):
+    """
+    Track a video file so that an interrupted run can pick up where it stopped.
+    Every CHECKPOINT_SECONDS of video the current output part is closed, its
+    raw detections are written next to it, and the frame index, ByteTrack
+    state (including the global track ID counter), statistics and part paths
+    are pickled to checkpoint_path; a rerun seeks to that frame and continues
+    with the same tracker. Parts are joined into output_path, and the
+    detection cache assembled from the per-part detections, once the file is
+    complete. Frames after the last checkpoint are tracked again on resume;
+    the detection log keeps only their first rows.
+    """
+    cap, width, height, fps, total_frames = open_video(source)
+    from ultralytics.trackers.basetrack import BaseTrack
+    cache = DetectionCache(source, MODEL_WEIGHTS)
+    stats = RunStats(source, fps, total_frames)
+    parts, raw_parts = [], []
+
+    ckpt = load_checkpoint(checkpoint_path, cache.key)
+    if ckpt is not None:
+        tracker = ckpt['tracker']
+        # IDs are handed out from a class-level counter that BYTETracker() resets
+        BaseTrack._count = ckpt['track_count']
+        stats.restore(ckpt['stats'])
+        parts, raw_parts = ckpt['parts'], ckpt['raw_parts']
+        cap.set(cv2.CAP_PROP_POS_FRAMES, stats.frame_count)
+        print(f"Resuming {source} at frame {stats.frame_count}/{total_frames}")
+    else:
+        tracker = make_tracker(load_tracker_cfg())
+
+    every = max(1, int(CHECKPOINT_SECONDS * fps))
+    writer = None
+    part_path = None
+    part_frames = 0
+    completed = False
+    try:
+        while True:
+            if writer is None:
+                part_path = f"{output_path}.part{len(parts):03d}.mp4"
+                writer = AsyncVideoWriter(part_path, fps, (width, height), encoder)
+                part_frames = 0
+            loop_start = time.time()
+            ret, frame = cap.read()
+            if not ret:
+                completed = True
+                break
+
+            results = model.predict(source=frame, conf=CACHE_CONF_FLOOR, verbose=False)[0]
+            raw = extract_raw(results)
+            cache.append(raw)
+            detections = track_raw(tracker, raw, (height, width))
+            stats.add(detections)
+
+            fps_display = 1.0 / (time.time() - loop_start + 1e-6)
+            draw_detections(frame, detections, fps_display, stats.frame_count, total_frames)
+            writer.write(frame)
+            part_frames += 1
+
+            if stats.frame_count % every == 0:
+                writer.release()
+                writer = None
+                parts.append(part_path)
+                # Only this part's detections are written; earlier parts are already on disk
+                raw_parts.append(part_path[:-len(".mp4")] + CACHE_SUFFIX)
+                save_raw_part(raw_parts[-1], cache.frames)
+                cache.frames = []
+                save_checkpoint(checkpoint_path, {
+                    'key': cache.key,
+                    'tracker': tracker,
+                    'track_count': BaseTrack._count,
+                    'stats': stats.state(),
+                    'parts': parts,
+                    'raw_parts': raw_parts,
+                })
+    finally:
+        cap.release()
+        if writer is not None:
+            writer.release()
+            if completed and part_frames:
+                parts.append(part_path)
+            elif os.path.exists(part_path):
+                os.remove(part_path)
+        stats.close()
+
+    join_parts(parts, output_path)
+    cache.frames = [raw for path in raw_parts for raw in load_raw_part(path)] + cache.frames
+    cache.save(fps, width, height)
+    for path in raw_parts:
+        os.remove(path)
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    return stats
+
+
+def find_batch_sources(spec):
+    """Video files in a directory (BATCH_PATTERNS) or matching a glob."""
+    if os.path.isdir(spec):
+        paths = [p for pattern in BATCH_PATTERNS for p in glob.glob(os.path.join(spec, pattern))]
+    else:
+        paths = glob.glob(spec)
+    return sorted({os.path.normpath(p) for p in paths
+                   if os.path.isfile(p) and not p.endswith(CACHE_SUFFIX)})
+
+
+def _batch_paths(source, output_dir):
+    stem = os.path.splitext(os.path.basename(source))[0]
+    base = os.path.join(output_dir, stem)
+    return base + "-tracked.mp4", base + ".ckpt", base + ".summary.json"
+
+
+def _batch_file(task):
+    """Worker: track one file of a batch; returns its summary (status 'done' or 'failed')."""
+    source, output_dir, encoder = task
+    output_path, checkpoint_path, summary_path = _batch_paths(source, output_dir)
+    try:
+        cache = DetectionCache(source, MODEL_WEIGHTS)
+        if cache.load():
+            stats = run_cached(cache, source, output_path, encoder, show=False)
+        else:
+            stats = run_resumable(_worker_model, source, output_path, checkpoint_path, encoder)
+    except Exception as e:
+        print(f"\n{source} failed: {e}")
+        return {'source': source, 'status': 'failed', 'error': str(e)}
+
+    summary = stats.summary()
+    summary.update(status='done', output=output_path)
+    with open(summary_path, "w") as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+
+def run_batch(spec, output_dir=BATCH_OUTPUT_DIR, workers=1, encoder=OUTPUT_ENCODER):
+    """
+    Track every video matched by spec on a pool of worker processes. Files
+    with a summary in output_dir are skipped and interrupted files resume from
+    their checkpoint, so rerunning the same command finishes the batch.
+    """
+    if load_tracker_cfg().tracker_type != "bytetrack":
+        raise ValueError("Batch mode checkpoints ByteTrack state; set tracker_type: bytetrack")
+    sources = find_batch_sources(spec)
+    if not sources:
+        raise FileNotFoundError(f"No video files match: {spec}")
+    os.makedirs(output_dir, exist_ok=True)
+
+    results, tasks = [], []
+    for source in sources:
+        summary_path = _batch_paths(source, output_dir)[2]
+        if os.path.isfile(summary_path):
+            with open(summary_path) as f:
+                results.append(json.load(f))
+        else:
+            tasks.append((source, output_dir, encoder))
+    workers = max(1, min(workers, len(tasks) or 1))
+    print(f"\nBatch: {len(sources)} files, {len(results)} already done, "
+          f"{len(tasks)} to process on {workers} workers")
+
+    batch_start = time.time()
+    if tasks:
+        ctx = multiprocessing.get_context("spawn")
+        with ctx.Pool(workers, initializer=_init_worker, initargs=(MODEL_WEIGHTS,)) as pool:
+            for n, summary in enumerate(pool.imap_unordered(_batch_file, tasks), 1):
+                results.append(summary)
+                print(f"\n[{n}/{len(tasks)}] {summary['source']}: {summary['status']}")
+
+    done = [r for r in results if r['status'] == 'done']
+    report = {
+        'files': len(sources),
+        'done': len(done),
+        'failed': [r['source'] for r in results if r['status'] != 'done'],
+        'batch_seconds': round(time.time() - batch_start, 1),
+        'total_frames': sum(r['frames'] for r in done),
+        'total_bison_detections': sum(r['total_bison_detections'] for r in done),
+        'max_bison_in_frame': max((r['max_bison_in_frame'] for r in done), default=0),
+        # Track IDs are per video, so this is a sum of per-file distinct counts
+        'distinct_bison_sum': sum(r['distinct_bison']['total'] for r in done),
+        'per_file': sorted(results, key=lambda r: r['source']),
+    }
+    report_path = os.path.join(output_dir, "batch_summary.json")
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
 
-    # Final statistics
-    total_time = time.time() - start_time
     print("\n" + "=" * 60)
-    print("PROCESSING COMPLETED")
+    print("BATCH COMPLETED" if not report['failed'] else "BATCH FINISHED WITH FAILURES")
+    print("=" * 60)
+    print(f"Files done: {report['done']}/{report['files']}")
+    for source in report['failed']:
+        print(f"  failed: {source} (rerun to resume)")
+    print(f"Total frames: {report['total_frames']:,}")
+    print(f"Max bison in single frame: {report['max_bison_in_frame']}")
+    print(f"Summary saved to: {report_path}")
+    print("=" * 60)
+    return report
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Headless bison tracking with ByteTrack")
+    parser.add_argument("--source", default=VIDEO_SOURCE, help="video file or stream URL")
+    parser.add_argument("--output", default=OUTPUT_PATH, help="annotated output video")
+    parser.add_argument("--workers", type=int, default=PARALLEL_WORKERS,
+                        help="parallel worker processes for video files (0 = sequential); "
+                             "with --batch, files processed at once")
+    parser.add_argument("--batch", metavar="DIR_OR_GLOB",
+                        help="track every video in a directory or matching a glob, resumably")
+    parser.add_argument("--output-dir", default=BATCH_OUTPUT_DIR,
+                        help="outputs, checkpoints and summaries for --batch")
+    parser.add_argument("--chunk-seconds", type=float, default=CHUNK_SECONDS,
+                        help="chunk length for parallel mode")
+    parser.add_argument("--overlap", type=int, default=CHUNK_OVERLAP,
+                        help="frames of overlap between chunks for ID stitching")
+    parser.add_argument("--encoder", choices=("ffmpeg", "mp4v"), default=OUTPUT_ENCODER,
+                        help="output encoder: H.264 via ffmpeg, or OpenCV mp4v")
+    parser.add_argument("--show", action="store_true", default=not HEADLESS_MODE,
+                        help="show a preview window (press q to stop)")
+    parser.add_argument("--no-cache", dest="cache", action="store_false", default=DETECTION_CACHE,
+                        help=f"do not read or write the {CACHE_SUFFIX} detection sidecar")
+    parser.add_argument("--no-render", dest="render", action="store_false",
+                        help="skip drawing/encoding the output video (statistics only)")
+    parser.add_argument("--sample-fps", type=float, default=SAMPLE_FPS,
+                        help="analyze only this many frames per second (0 = every frame)")
+    parser.add_argument("--seek", action="store_true",
+                        help="with --sample-fps, seek between analyzed frames instead of grab()")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
     print("=" * 60)
-    print(f"Total frames processed: {frame_count:,}")
-    print(f"Total processing time: {total_time:.1f} seconds ({total_time/60:.1f} minutes)")
-    print(f"Average processing FPS: {frame_count/total_time:.1f}")
-    print(f"Max bison in single frame: {max_bison_in_frame}")
-    print(f"Average bison per frame: {total_bison_detections/frame_count:.1f}")
-    print(f"Output saved to: {OUTPUT_PATH}")
-    
-    # File size info
-    if os.path.exists(OUTPUT_PATH):
-        file_size = os.path.getsize(OUTPUT_PATH) / (1024*1024)  # MB
-        print(f"Output file size: {file_size:.1f} MB")
-    
+    print("Headless Bison Tracking with ByteTracker")
     print("=" * 60)
 
+    if not os.path.isfile(TRACKER_CFG):
+        raise FileNotFoundError(f"Tracker config not found: {TRACKER_CFG}")
+    print(f"Using tracker config: {TRACKER_CFG}")
+
+    if args.batch:
+        run_batch(args.batch, args.output_dir, args.workers, args.encoder)
+        return
+
+    cache = None
+    if args.cache and os.path.isfile(args.source):
+        cache = DetectionCache(args.source, MODEL_WEIGHTS)
+        if load_tracker_cfg().tracker_type != "bytetrack":
+            print("Detection cache replay needs tracker_type: bytetrack; cache disabled.")
+            cache = None
+
+    if cache is not None and cache.load():
+        stats = run_cached(cache, args.source, args.output, args.encoder, args.show, args.render,
+                           args.sample_fps, args.seek)
+    elif args.workers > 0 and os.path.isfile(args.source) and not args.sample_fps:
+        stats = run_parallel(args.source, args.output, args.workers,
+                             args.chunk_seconds, args.overlap, args.encoder, args.show, args.render)
+    else:
+        if args.workers > 0:
+            print("Parallel mode needs a video file without --sample-fps; "
+                  "falling back to sequential processing.")
+        # Load model
+        print(f"Loading model: {MODEL_WEIGHTS}")
+        model = YOLO(MODEL_WEIGHTS)
+        stats = run_sequential(model, args.source, args.output, args.encoder, args.show,
+                               cache, args.render, args.sample_fps, args.seek)
+
+    # Final statistics
+    stats.print_summary(args.output if args.render else None)
+
 if __name__ == "__main__":
     main()
 